@@ -0,0 +1,14 @@
+"""
+Management command to rebuild the agent debt aging snapshot
+Schedule it every few minutes (cron / Task Scheduler) to keep dashboards current
+"""
+from django.core.management.base import BaseCommand
+from apps.agents.models import AgentDebtAging
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the agent debt aging snapshot used by dashboard reports'
+    
+    def handle(self, *args, **options):
+        count = AgentDebtAging.refresh()
+        self.stdout.write(self.style.SUCCESS(f'✓ Debt aging refreshed for {count} agents'))
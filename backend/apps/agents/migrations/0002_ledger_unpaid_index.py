@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-16 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="agentledger",
+            index=models.Index(
+                condition=models.Q(("is_paid", False)),
+                fields=["agent", "transfer_date", "debt_amount"],
+                name="idx_ledger_agent_unpaid",
+            ),
+        ),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 4.2.30 on 2026-10-16 02:36
+
+from django.db import migrations, models
+
+
+# agents.outstanding_debt = SUM(debt_amount) of the agent's unpaid ledger rows.
+# Triggers keep it current for every write path, including bulk_create and
+# QuerySet.update(), which bypass model signals.
+# SQLite drops a table's triggers when Django rebuilds it (AlterField etc.), so
+# a later migration that rebuilds agent_ledger must run create_triggers again.
+TRIGGER_SQL = {
+    "sqlite": [
+        """
+        CREATE TRIGGER agent_ledger_debt_insert AFTER INSERT ON agent_ledger
+        WHEN NOT NEW.is_paid
+        BEGIN
+            UPDATE agents SET outstanding_debt = outstanding_debt + NEW.debt_amount
+            WHERE id = NEW.agent_id;
+        END
+        """,
+        """
+        CREATE TRIGGER agent_ledger_debt_update
+        AFTER UPDATE OF agent_id, debt_amount, is_paid ON agent_ledger
+        BEGIN
+            UPDATE agents SET outstanding_debt = outstanding_debt - OLD.debt_amount
+            WHERE id = OLD.agent_id AND NOT OLD.is_paid;
+            UPDATE agents SET outstanding_debt = outstanding_debt + NEW.debt_amount
+            WHERE id = NEW.agent_id AND NOT NEW.is_paid;
+        END
+        """,
+        """
+        CREATE TRIGGER agent_ledger_debt_delete AFTER DELETE ON agent_ledger
+        WHEN NOT OLD.is_paid
+        BEGIN
+            UPDATE agents SET outstanding_debt = outstanding_debt - OLD.debt_amount
+            WHERE id = OLD.agent_id;
+        END
+        """,
+    ],
+    "postgresql": [
+        """
+        CREATE FUNCTION agent_ledger_outstanding_debt() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND NOT OLD.is_paid THEN
+                UPDATE agents SET outstanding_debt = outstanding_debt - OLD.debt_amount
+                WHERE id = OLD.agent_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NOT NEW.is_paid THEN
+                UPDATE agents SET outstanding_debt = outstanding_debt + NEW.debt_amount
+                WHERE id = NEW.agent_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER agent_ledger_outstanding_debt
+        AFTER INSERT OR DELETE OR UPDATE OF agent_id, debt_amount, is_paid
+        ON agent_ledger
+        FOR EACH ROW EXECUTE FUNCTION agent_ledger_outstanding_debt()
+        """,
+    ],
+}
+
+DROP_TRIGGER_SQL = {
+    "sqlite": [
+        "DROP TRIGGER IF EXISTS agent_ledger_debt_insert",
+        "DROP TRIGGER IF EXISTS agent_ledger_debt_update",
+        "DROP TRIGGER IF EXISTS agent_ledger_debt_delete",
+    ],
+    "postgresql": [
+        "DROP TRIGGER IF EXISTS agent_ledger_outstanding_debt ON agent_ledger",
+        "DROP FUNCTION IF EXISTS agent_ledger_outstanding_debt()",
+    ],
+}
+
+BACKFILL_SQL = """
+    UPDATE agents SET outstanding_debt = COALESCE((
+        SELECT SUM(debt_amount) FROM agent_ledger
+        WHERE agent_ledger.agent_id = agents.id AND NOT agent_ledger.is_paid
+    ), 0)
+"""
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in TRIGGER_SQL:
+        raise NotImplementedError(f"No outstanding_debt triggers for {vendor}")
+    for sql in TRIGGER_SQL[vendor]:
+        schema_editor.execute(sql)
+    schema_editor.execute(BACKFILL_SQL)
+
+
+def drop_triggers(apps, schema_editor):
+    for sql in DROP_TRIGGER_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0002_ledger_unpaid_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agent",
+            name="outstanding_debt",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                help_text="Sum of unpaid ledger debt, kept current by database triggers",
+                max_digits=12,
+            ),
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
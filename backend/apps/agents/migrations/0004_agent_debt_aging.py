@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-16 02:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0003_agent_outstanding_debt"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AgentDebtAging",
+            fields=[
+                (
+                    "agent",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="debt_aging",
+                        serialize=False,
+                        to="agents.agent",
+                    ),
+                ),
+                (
+                    "b0_7",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "b8_30",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "b31_60",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "b61_90",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "b90_plus",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("refreshed_at", models.DateTimeField()),
+            ],
+            options={
+                "db_table": "agent_debt_aging",
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-16 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0004_agent_debt_aging"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="agentledger",
+            name="agent_ledge_agent_i_bccac4_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="agentpayment",
+            name="agent_payme_agent_i_9c288d_idx",
+        ),
+        migrations.AddIndex(
+            model_name="agentledger",
+            index=models.Index(
+                fields=[
+                    "agent",
+                    "-transfer_date",
+                    "debt_amount",
+                    "paid_amount",
+                    "is_paid",
+                ],
+                name="idx_ledger_agent_covering",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="agentpayment",
+            index=models.Index(
+                fields=["agent", "-created_at", "amount"], name="idx_pay_agent_covering"
+            ),
+        ),
+    ]
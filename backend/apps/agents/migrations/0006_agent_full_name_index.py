@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-16 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0005_covering_statement_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="agent",
+            index=models.Index(fields=["full_name"], name="agents_full_na_9f9627_idx"),
+        ),
+    ]
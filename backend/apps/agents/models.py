@@ -2,13 +2,22 @@
 Agent and consignment tracking models for EROM System
 Tracks stock transfers to field technicians and debt management
 """
-from django.db import models
-from django.db.models import Sum, Q
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, models, transaction
+from django.db.models import Sum, Q, F, Case, When, Value, ExpressionWrapper
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from apps.core.models import TimeStampedModel, User
 from apps.inventory.models import Product
 
 
+def get_debt_cache():
+    """Cache backend holding agent debt figures (AGENT_DEBT_CACHE_ALIAS)"""
+    return caches[settings.AGENT_DEBT_CACHE_ALIAS]
+
+
 class Agent(TimeStampedModel):
     """
     Field technicians who take parts on consignment
@@ -32,6 +41,13 @@ class Agent(TimeStampedModel):
         default=0,
         help_text='Maximum debt allowed (0 = unlimited)'
     )
+    outstanding_debt = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text='Sum of unpaid ledger debt, kept current by database triggers'
+    )
     
     # Status
     is_active = models.BooleanField(default=True)
@@ -41,25 +57,61 @@ class Agent(TimeStampedModel):
     created_by = models.ForeignKey(User, on_delete=models.PROTECT, related_name='agents_created')
     notes = models.TextField(blank=True)
     
+    # Debt aging buckets as (label, upper age in days); the last one is open-ended
+    DEBT_AGE_BUCKETS = [
+        ('0-7', 7),
+        ('8-30', 30),
+        ('31-60', 60),
+        ('61-90', 90),
+        ('90+', None),
+    ]
+    
     class Meta:
         db_table = 'agents'
         ordering = ['full_name']
         indexes = [
             models.Index(fields=['phone_number']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['full_name']),
         ]
     
     def __str__(self):
         return self.full_name
     
+    def save(self, *args, **kwargs):
+        # outstanding_debt is written only by the agent_ledger triggers; saving
+        # this instance's copy would undo debt recorded since it was loaded
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in deferred
+                ]
+            kwargs['update_fields'] = [name for name in update_fields if name != 'outstanding_debt']
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def debt_by_age_cache_key(agent_id):
+        return f'agents:{agent_id}:debt_by_age'
+    
+    @classmethod
+    def invalidate_debt_cache(cls, agent_id):
+        """Drop the agent's cached debt aging after its ledger changes"""
+        get_debt_cache().delete(cls.debt_by_age_cache_key(agent_id))
+    
     @property
     def total_debt(self):
-        """Calculate total outstanding debt"""
-        return self.ledger_entries.filter(
-            is_paid=False
-        ).aggregate(
-            total=Sum('debt_amount')
-        )['total'] or 0
+        """Total outstanding debt (maintained by triggers on agent_ledger)"""
+        return self.outstanding_debt
+    
+    def check_headroom(self, extra=Decimal('0')):
+        """Return (ok, current_debt): whether `extra` more debt fits the credit limit"""
+        current_debt = self.total_debt
+        if self.credit_limit == 0:  # Unlimited
+            return True, current_debt
+        return current_debt + extra <= self.credit_limit, current_debt
     
     @property
     def can_take_more_stock(self):
@@ -68,39 +120,172 @@ class Agent(TimeStampedModel):
             return True
         return self.total_debt < self.credit_limit
     
-    def get_debt_by_age(self):
-        """Get debt categorized by age (7, 30, 60, 90+ days)"""
+    @classmethod
+    def debt_age_cutoffs(cls):
+        """(label, oldest transfer_date in the bucket) per bucket; None for the open-ended one"""
         now = timezone.now()
+        return tuple(
+            (label, now - timezone.timedelta(days=days) if days is not None else None)
+            for label, days in cls.DEBT_AGE_BUCKETS
+        )
+    
+    @classmethod
+    def debt_by_age_annotations(cls):
+        """Unpaid debt per aging bucket, as annotations for an Agent queryset"""
+        annotations = {}
+        newer_cutoff = None
+        for index, (label, cutoff) in enumerate(cls.debt_age_cutoffs()):
+            condition = Q(ledger_entries__is_paid=False)
+            if cutoff is not None:
+                condition &= Q(ledger_entries__transfer_date__gte=cutoff)
+            if newer_cutoff is not None:
+                condition &= Q(ledger_entries__transfer_date__lt=newer_cutoff)
+            newer_cutoff = cutoff
+            
+            annotations[f'debt_age_{index}'] = Coalesce(
+                Sum('ledger_entries__debt_amount', filter=condition),
+                Value(Decimal('0'))
+            )
+        return annotations
+    
+    @classmethod
+    def empty_debt_by_age(cls):
+        return {label: Decimal('0') for label, _ in cls.DEBT_AGE_BUCKETS}
+    
+    @classmethod
+    def debt_by_age_map(cls, agent_ids=None):
+        """Debt by age for many agents from one grouped query, keyed by agent id"""
+        annotations = cls.debt_by_age_annotations()
+        agents = cls.objects.order_by()
+        if agent_ids is not None:
+            agents = agents.filter(pk__in=agent_ids)
         
         return {
-            '0-7': self.ledger_entries.filter(
-                is_paid=False,
-                transfer_date__gte=now - timezone.timedelta(days=7)
-            ).aggregate(total=Sum('debt_amount'))['total'] or 0,
-            
-            '8-30': self.ledger_entries.filter(
-                is_paid=False,
-                transfer_date__gte=now - timezone.timedelta(days=30),
-                transfer_date__lt=now - timezone.timedelta(days=7)
-            ).aggregate(total=Sum('debt_amount'))['total'] or 0,
-            
-            '31-60': self.ledger_entries.filter(
-                is_paid=False,
-                transfer_date__gte=now - timezone.timedelta(days=60),
-                transfer_date__lt=now - timezone.timedelta(days=30)
-            ).aggregate(total=Sum('debt_amount'))['total'] or 0,
-            
-            '61-90': self.ledger_entries.filter(
-                is_paid=False,
-                transfer_date__gte=now - timezone.timedelta(days=90),
-                transfer_date__lt=now - timezone.timedelta(days=60)
-            ).aggregate(total=Sum('debt_amount'))['total'] or 0,
-            
-            '90+': self.ledger_entries.filter(
-                is_paid=False,
-                transfer_date__lt=now - timezone.timedelta(days=90)
-            ).aggregate(total=Sum('debt_amount'))['total'] or 0,
+            row['pk']: {
+                label: row[f'debt_age_{index}']
+                for index, (label, _) in enumerate(cls.DEBT_AGE_BUCKETS)
+            }
+            for row in agents.annotate(**annotations).values('pk', *annotations)
         }
+    
+    def get_debt_by_age(self, unpaid_entries=None):
+        """
+        Get debt categorized by age (7, 30, 60, 90+ days), cached briefly
+        unpaid_entries: this agent's unpaid ledger rows when the caller already fetched them
+        """
+        if unpaid_entries is not None:
+            return self._bucket_debt_by_age(unpaid_entries)
+        
+        if hasattr(self, 'debt_age_0'):
+            # Already summed by the queryset (see debt_by_age_annotations)
+            return {
+                label: getattr(self, f'debt_age_{index}')
+                for index, (label, _) in enumerate(self.DEBT_AGE_BUCKETS)
+            }
+        
+        return get_debt_cache().get_or_set(
+            self.debt_by_age_cache_key(self.pk),
+            self._aggregate_debt_by_age,
+            settings.AGENT_DEBT_CACHE_TIMEOUT
+        )
+    
+    def _bucket_debt_by_age(self, unpaid_entries):
+        # Same buckets as _aggregate_debt_by_age, summed over rows already in memory
+        cutoffs = self.debt_age_cutoffs()
+        debt_by_age = self.empty_debt_by_age()
+        for entry in unpaid_entries:
+            label = next(
+                label for label, cutoff in cutoffs
+                if cutoff is None or entry.transfer_date >= cutoff
+            )
+            debt_by_age[label] += entry.debt_amount
+        return debt_by_age
+    
+    def _aggregate_debt_by_age(self):
+        # Label each unpaid entry with its bucket and sum per label in SQL
+        bucket = Case(
+            *[
+                When(transfer_date__gte=cutoff, then=Value(label))
+                for label, cutoff in self.debt_age_cutoffs() if cutoff is not None
+            ],
+            default=Value(self.DEBT_AGE_BUCKETS[-1][0]),
+            output_field=models.CharField()
+        )
+        totals = self.ledger_entries.filter(
+            is_paid=False
+        ).annotate(
+            bucket=bucket
+        ).order_by().values('bucket').annotate(total=Sum('debt_amount'))
+        
+        debt_by_age = self.empty_debt_by_age()
+        for row in totals:
+            debt_by_age[row['bucket']] = row['total']
+        return debt_by_age
+
+
+class AgentDebtAging(models.Model):
+    """
+    Snapshot of unpaid debt per aging bucket for every agent
+    Rebuilt by the refresh_debt_aging command; read by dashboard aging reports
+    """
+    agent = models.OneToOneField(
+        Agent, on_delete=models.CASCADE, primary_key=True, related_name='debt_aging'
+    )
+    
+    # One column per Agent.DEBT_AGE_BUCKETS entry, in the same order
+    b0_7 = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    b8_30 = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    b31_60 = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    b61_90 = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    b90_plus = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    refreshed_at = models.DateTimeField()
+    
+    BUCKET_FIELDS = ['b0_7', 'b8_30', 'b31_60', 'b61_90', 'b90_plus']
+    
+    class Meta:
+        db_table = 'agent_debt_aging'
+    
+    def __str__(self):
+        return f"Debt aging for agent {self.agent_id}"
+    
+    def as_dict(self):
+        """Bucket totals keyed by the Agent.DEBT_AGE_BUCKETS labels"""
+        return {
+            label: getattr(self, field)
+            for (label, _), field in zip(Agent.DEBT_AGE_BUCKETS, self.BUCKET_FIELDS)
+        }
+    
+    @classmethod
+    def refresh(cls):
+        """Rebuild the snapshot for all agents from one aggregate query"""
+        refreshed_at = timezone.now()
+        snapshot = [
+            cls(
+                agent_id=agent_id,
+                refreshed_at=refreshed_at,
+                **dict(zip(cls.BUCKET_FIELDS, debt_by_age.values()))
+            )
+            for agent_id, debt_by_age in Agent.debt_by_age_map().items()
+        ]
+        
+        # Swap in one transaction so readers never see a half-built snapshot
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(snapshot, batch_size=settings.BULK_BATCH_SIZE)
+        return len(snapshot)
+
+
+class AgentLedgerQuerySet(models.QuerySet):
+    
+    def with_remaining_debt(self):
+        """Compute remaining_debt in SQL so it can be filtered and read without Python math"""
+        return self.annotate(
+            remaining_debt=ExpressionWrapper(
+                F('debt_amount') - F('paid_amount'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2)
+            )
+        )
 
 
 class AgentLedger(TimeStampedModel):
@@ -116,6 +301,7 @@ class AgentLedger(TimeStampedModel):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     debt_amount = models.DecimalField(max_digits=10, decimal_places=2, help_text='Total amount owed')
     
+    # Stamped in Python; move to db_default=Now() once the Django pin allows 5.0+
     transfer_date = models.DateTimeField(default=timezone.now)
     
     # Payment tracking
@@ -130,23 +316,103 @@ class AgentLedger(TimeStampedModel):
     transferred_by = models.ForeignKey(User, on_delete=models.PROTECT, related_name='agent_transfers')
     notes = models.TextField(blank=True)
     
+    objects = AgentLedgerQuerySet.as_manager()
+    
     class Meta:
         db_table = 'agent_ledger'
         ordering = ['-transfer_date']
         indexes = [
-            models.Index(fields=['agent', '-transfer_date']),
+            # Trailing amount columns cover statement running balances (SQLite has no INCLUDE)
+            models.Index(
+                fields=['agent', '-transfer_date', 'debt_amount', 'paid_amount', 'is_paid'],
+                name='idx_ledger_agent_covering'
+            ),
             models.Index(fields=['is_paid']),
             models.Index(fields=['transfer_date']),
+            # Debt and aging aggregates only read unpaid rows; debt_amount as a
+            # trailing key column lets SQLite answer the SUM from the index alone
+            models.Index(
+                fields=['agent', 'transfer_date', 'debt_amount'],
+                condition=Q(is_paid=False),
+                name='idx_ledger_agent_unpaid'
+            ),
         ]
     
     def __str__(self):
         return f"{self.agent.full_name} - {self.product.name} ({self.quantity})"
     
+    @classmethod
+    def bulk_append(cls, entries, batch_size=None):
+        """
+        Insert many ledger entries (e.g. an import) in batches in one transaction
+        bulk_create sends no post_save, so debt caches are dropped once per agent here
+        """
+        with transaction.atomic():
+            created = cls.objects.bulk_create(
+                entries, batch_size=batch_size or settings.BULK_BATCH_SIZE
+            )
+        for agent_id in {entry.agent_id for entry in created}:
+            Agent.invalidate_debt_cache(agent_id)
+        return created
+    
+    @classmethod
+    def apply_payment(cls, agent_id, amount, paid_at, entry_ids=None):
+        """
+        Settle unpaid entries oldest first (FIFO) with one windowed UPDATE
+        Returns (entries updated, amount applied)
+        """
+        entries = cls.objects.filter(agent_id=agent_id, is_paid=False)
+        if entry_ids:
+            entries = entries.filter(id__in=entry_ids)
+        total_due = entries.aggregate(
+            total=Coalesce(Sum(F('debt_amount') - F('paid_amount')), Value(Decimal('0')))
+        )['total']
+        
+        id_filter = ''
+        if entry_ids:
+            id_filter = f"AND id IN ({', '.join(['%s'] * len(entry_ids))})"
+        
+        # csum is the running total due up to and including each entry; an entry
+        # is settled when csum fits in the payment and partly paid when it straddles it.
+        # Settled rows copy debt_amount so float storage on SQLite cannot leave them short;
+        # amounts are CAST because SQLite binds Decimal parameters as text.
+        paid_at = connection.ops.adapt_datetimefield_value(paid_at)
+        sql = f"""
+            UPDATE {cls._meta.db_table}
+            SET paid_amount = CASE
+                    WHEN ROUND(cum.csum, 2) <= CAST(%s AS NUMERIC) THEN debt_amount
+                    ELSE paid_amount + (CAST(%s AS NUMERIC) - (cum.csum - cum.due))
+                END,
+                is_paid = (ROUND(cum.csum, 2) <= CAST(%s AS NUMERIC)),
+                payment_date = CASE WHEN ROUND(cum.csum, 2) <= CAST(%s AS NUMERIC) THEN %s ELSE payment_date END,
+                updated_at = %s
+            FROM (
+                SELECT id, debt_amount - paid_amount AS due,
+                       SUM(debt_amount - paid_amount) OVER (ORDER BY transfer_date, id) AS csum
+                FROM {cls._meta.db_table}
+                WHERE agent_id = %s AND NOT is_paid {id_filter}
+            ) AS cum
+            WHERE {cls._meta.db_table}.id = cum.id AND cum.csum - cum.due < CAST(%s AS NUMERIC)
+        """
+        
+        params = [amount, amount, amount, amount, paid_at, paid_at, agent_id, *(entry_ids or []), amount]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            updated = cursor.rowcount
+        return updated, min(amount, total_due)
+    
     @property
     def remaining_debt(self):
-        """Calculate remaining unpaid amount"""
+        """Remaining unpaid amount (read from SQL when the queryset annotates it)"""
+        if '_remaining_debt' in self.__dict__:
+            return self._remaining_debt
         return self.debt_amount - self.paid_amount
     
+    @remaining_debt.setter
+    def remaining_debt(self, value):
+        # Set by AgentLedgerQuerySet.with_remaining_debt()
+        self._remaining_debt = value
+    
     @property
     def days_outstanding(self):
         """Calculate how many days the debt has been outstanding"""
@@ -185,7 +451,7 @@ class AgentPayment(TimeStampedModel):
         db_table = 'agent_payments'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['agent', '-created_at']),
+            models.Index(fields=['agent', '-created_at', 'amount'], name='idx_pay_agent_covering'),
         ]
     
     def __str__(self):
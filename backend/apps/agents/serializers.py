@@ -5,10 +5,13 @@ from rest_framework import serializers
 from .models import Agent, AgentLedger, AgentPayment
 from apps.inventory.serializers import ProductListSerializer
 
+# Shared read-only money field; DRF deep-copies declared fields per serializer instance
+_MONEY = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
 
 class AgentListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for agent lists"""
-    total_debt = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    total_debt = _MONEY
     
     class Meta:
         model = Agent
@@ -21,7 +24,7 @@ class AgentListSerializer(serializers.ModelSerializer):
 class AgentDetailSerializer(serializers.ModelSerializer):
     """Detailed serializer for single agent"""
     created_by_name = serializers.CharField(source='created_by.full_name', read_only=True)
-    total_debt = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    total_debt = _MONEY
     can_take_more_stock = serializers.BooleanField(read_only=True)
     debt_by_age = serializers.SerializerMethodField()
     
@@ -56,7 +59,7 @@ class AgentLedgerSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_sku = serializers.CharField(source='product.sku', read_only=True)
     transferred_by_name = serializers.CharField(source='transferred_by.full_name', read_only=True)
-    remaining_debt = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    remaining_debt = _MONEY
     days_outstanding = serializers.IntegerField(read_only=True)
     
     class Meta:
@@ -83,15 +86,18 @@ class StockTransferSerializer(serializers.Serializer):
         from apps.inventory.models import Product
         from .models import Agent
         
-        # Validate agent exists and is active
+        # Rows are locked so the stock and credit checks still hold when the
+        # caller writes the transfer in the same transaction
+        
+        # Validate agent exists and is active (the row carries its outstanding debt)
         try:
-            agent = Agent.objects.get(id=data['agent_id'], is_active=True)
+            agent = Agent.objects.select_for_update().get(id=data['agent_id'], is_active=True)
         except Agent.DoesNotExist:
             raise serializers.ValidationError({'agent_id': 'Agent not found or inactive'})
         
         # Validate product exists and has enough stock
         try:
-            product = Product.objects.get(id=data['product_id'], is_active=True)
+            product = Product.objects.select_for_update().get(id=data['product_id'], is_active=True)
         except Product.DoesNotExist:
             raise serializers.ValidationError({'product_id': 'Product not found or inactive'})
         
@@ -100,13 +106,13 @@ class StockTransferSerializer(serializers.Serializer):
                 'quantity': f'Insufficient stock. Available: {product.quantity_in_stock}'
             })
         
-        # Check agent credit limit
+        # Check agent credit limit (0 = unlimited) including this transfer
         debt_amount = data['quantity'] * data['unit_price']
-        if not agent.can_take_more_stock:
-            if agent.credit_limit > 0 and (agent.total_debt + debt_amount) > agent.credit_limit:
-                raise serializers.ValidationError({
-                    'agent_id': f'Credit limit exceeded. Current debt: {agent.total_debt}, Limit: {agent.credit_limit}'
-                })
+        has_headroom, current_debt = agent.check_headroom(debt_amount)
+        if not has_headroom:
+            raise serializers.ValidationError({
+                'agent_id': f'Credit limit exceeded. Current debt: {current_debt}, Limit: {agent.credit_limit}'
+            })
         
         data['agent'] = agent
         data['product'] = product
@@ -0,0 +1,23 @@
+"""
+Signals for agents app
+Keeps cached debt figures in step with ledger and payment writes
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Agent, AgentLedger, AgentPayment
+
+
+@receiver(post_save, sender=AgentLedger)
+@receiver(post_delete, sender=AgentLedger)
+@receiver(post_save, sender=AgentPayment)
+@receiver(post_delete, sender=AgentPayment)
+def invalidate_agent_debt(sender, instance, **kwargs):
+    """Drop cached debt figures for the agent the entry belongs to"""
+    Agent.invalidate_debt_cache(instance.agent_id)
+
+
+@receiver(post_save, sender=Agent)
+def invalidate_new_agent_debt(sender, instance, created, **kwargs):
+    """A reused primary key must not pick up figures cached for an old row"""
+    if created:
+        Agent.invalidate_debt_cache(instance.pk)
@@ -0,0 +1,330 @@
+"""
+API tests for agent endpoints
+"""
+from io import StringIO
+from unittest import mock
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from decimal import Decimal
+from datetime import timedelta
+from apps.core.models import User
+from apps.inventory.models import Category, Brand, Product
+from django.core.management import call_command
+from apps.agents.models import Agent, AgentLedger
+from apps.agents.views import AgentCursorPagination
+
+
+class AgentAPITests(TestCase):
+    """Test agent API endpoints"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        
+        self.owner = User.objects.create(
+            username="owner",
+            full_name="Owner",
+            role=User.OWNER,
+            is_active=True
+        )
+        
+        # Authenticate as owner
+        self.token = self.owner.generate_session_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        
+        category = Category.objects.create(name="Screens")
+        brand = Brand.objects.create(name="Samsung")
+        self.product = Product.objects.create(
+            sku="SAM-LCD-001",
+            name="Samsung LCD",
+            category=category,
+            brand=brand,
+            cost_price=Decimal("40000"),
+            selling_price=Decimal("60000"),
+            quantity_in_stock=100,
+            created_by=self.owner
+        )
+        
+        self.agent = Agent.objects.create(
+            full_name="John Tech",
+            phone_number="+250788123456",
+            area="Kigali CBD",
+            credit_limit=Decimal("500000"),
+            created_by=self.owner
+        )
+    
+    def create_debt(self, amount, agent=None):
+        return AgentLedger.objects.create(
+            agent=agent or self.agent,
+            product=self.product,
+            quantity=1,
+            unit_price=amount,
+            debt_amount=amount,
+            transferred_by=self.owner
+        )
+    
+    def test_list_agents_includes_total_debt(self):
+        """Test agent list reports outstanding debt per agent"""
+        Agent.objects.create(
+            full_name="Debt Free",
+            phone_number="+250788000111",
+            created_by=self.owner
+        )
+        self.create_debt(Decimal("120000"))
+        self.create_debt(Decimal("30000"))
+        
+        url = reverse('agent-list')
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        debts = {row['full_name']: row['total_debt'] for row in response.data['results']}
+        self.assertEqual(Decimal(debts['John Tech']), Decimal("150000"))
+        self.assertEqual(Decimal(debts['Debt Free']), Decimal("0"))
+    
+    def test_list_agents_cursor_pages(self):
+        """Test agent list pages by name cursor"""
+        for i in range(3):
+            Agent.objects.create(
+                full_name=f"Agent {i}",
+                phone_number=f"+25078800{i:04d}",
+                created_by=self.owner
+            )
+        
+        url = reverse('agent-list')
+        names = []
+        with mock.patch.object(AgentCursorPagination, 'page_size', 2):
+            while url:
+                response = self.client.get(url)
+                self.assertLessEqual(len(response.data['results']), 2)
+                names += [row['full_name'] for row in response.data['results']]
+                url = response.data['next']
+        
+        self.assertEqual(names, ["Agent 0", "Agent 1", "Agent 2", "John Tech"])
+    
+    def test_search_agents(self):
+        """Test search matches substrings across name, phone, business and area"""
+        other = Agent.objects.create(
+            full_name="Alice Repairs",
+            phone_number="+250722555000",
+            business_name="Fix It Ltd",
+            area="Musanze",
+            created_by=self.owner
+        )
+        url = reverse('agent-list')
+        
+        def search(query):
+            response = self.client.get(url, {'search': query})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [row['id'] for row in response.data['results']]
+        
+        self.assertEqual(search('0788'), [self.agent.id])
+        self.assertEqual(search('fix it'), [other.id])
+        self.assertEqual(search('kigali john'), [self.agent.id])
+        self.assertEqual(search('a'), [other.id, self.agent.id])
+        self.assertEqual(search('nobody'), [])
+        
+        # Renames are picked up by the index
+        other.full_name = "Alice Johnson"
+        other.save()
+        self.assertEqual(search('john'), [other.id, self.agent.id])
+    
+    def test_retrieve_agent_credit_status(self):
+        """Test agent detail reports debt and credit headroom"""
+        self.create_debt(Decimal("500000"))
+        
+        url = reverse('agent-detail', args=[self.agent.id])
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(response.data['total_debt']), Decimal("500000"))
+        self.assertFalse(response.data['can_take_more_stock'])
+        self.assertEqual(Decimal(response.data['debt_by_age']['0-7']), Decimal("500000"))
+        self.assertEqual(Decimal(response.data['debt_by_age']['90+']), Decimal("0"))
+    
+    def test_retrieve_agent_single_query(self):
+        """Test agent detail loads debt and aging with the agent row"""
+        self.create_debt(Decimal("100000"))
+        url = reverse('agent-detail', args=[self.agent.id])
+        
+        # One query authenticates the token, one loads the agent
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_debt_aging_report_reads_snapshot(self):
+        """Test dashboard aging report serves the refreshed snapshot"""
+        self.create_debt(Decimal("100000"))
+        call_command('refresh_debt_aging', stdout=StringIO())
+        
+        # Debt added after the refresh shows up on the next one
+        self.create_debt(Decimal("50000"))
+        url = reverse('agent-debt-aging')
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 1)
+        row = response.data['data'][0]
+        self.assertEqual(row['agent_id'], self.agent.id)
+        self.assertEqual(row['debt_by_age']['0-7'], Decimal("100000"))
+        self.assertEqual(row['debt_by_age']['90+'], Decimal("0"))
+    
+    def test_ledger_list_loads_rendered_columns_only(self):
+        """Test ledger list renders joined names without deferred-field queries"""
+        self.create_debt(Decimal("20000"))
+        self.create_debt(Decimal("30000"))
+        url = reverse('ledger-list')
+        
+        # One query authenticates the token, one loads the page
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        row = response.data['results'][0]
+        self.assertEqual(row['agent_name'], "John Tech")
+        self.assertEqual(row['product_sku'], "SAM-LCD-001")
+        self.assertEqual(row['transferred_by_name'], "Owner")
+        self.assertEqual(Decimal(row['remaining_debt']), Decimal("30000"))
+    
+    def test_unpaid_ledger_totals(self):
+        """Test unpaid ledger summary totals, including an empty result"""
+        url = reverse('ledger-unpaid')
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_debt'], 0.0)
+        
+        self.create_debt(Decimal("45000"))
+        self.create_debt(Decimal("5000"))
+        
+        # Page rows, then one aggregate for total and count (auth is cached by now)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'agent_id': self.agent.id})
+        self.assertEqual(response.data['total_debt'], 50000.0)
+        self.assertEqual(response.data['count'], 2)
+    
+    def test_debt_summary_counts_fetched_entries(self):
+        """Test debt summary counts unpaid entries without a COUNT query"""
+        self.create_debt(Decimal("45000"))
+        self.create_debt(Decimal("5000"))
+        url = reverse('agent-debt-summary', args=[self.agent.id])
+        
+        # Auth, agent with aging buckets, unpaid rows
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.data['data']['unpaid_entries_count'], 2)
+        self.assertEqual(len(response.data['data']['unpaid_entries']), 2)
+        self.assertEqual(response.data['data']['debt_by_age']['0-7'], Decimal("50000"))
+    
+    def test_record_payment_settles_oldest_entries_first(self):
+        """Test payment is applied FIFO and settled entries leave the debt"""
+        oldest = self.create_debt(Decimal("100000"))
+        oldest.transfer_date = oldest.transfer_date - timedelta(days=3)
+        oldest.save(update_fields=['transfer_date'])
+        newest = self.create_debt(Decimal("80000"))
+        
+        url = reverse('agent-record-payment', args=[self.agent.id])
+        data = {'agent_id': self.agent.id, 'amount': '130000', 'payment_method': 'cash'}
+        response = self.client.post(url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['data']['updated_entries_count'], 2)
+        self.assertEqual(Decimal(response.data['data']['new_total_debt']), Decimal("80000"))
+        
+        oldest.refresh_from_db()
+        newest.refresh_from_db()
+        self.assertTrue(oldest.is_paid)
+        self.assertIsNotNone(oldest.payment_date)
+        self.assertFalse(newest.is_paid)
+        self.assertEqual(newest.paid_amount, Decimal("30000"))
+    
+    def test_record_payment_on_specific_entries(self):
+        """Test payment limited to chosen entries leaves the others untouched"""
+        first = self.create_debt(Decimal("100000"))
+        chosen = self.create_debt(Decimal("80000"))
+        
+        url = reverse('agent-record-payment', args=[self.agent.id])
+        data = {
+            'agent_id': self.agent.id,
+            'amount': '90000',
+            'payment_method': 'mobile_money',
+            'ledger_entries': [chosen.id]
+        }
+        response = self.client.post(url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Decimal(response.data['data']['amount_applied']), Decimal("80000"))
+        self.assertEqual(Decimal(response.data['data']['amount_remaining']), Decimal("10000"))
+        first.refresh_from_db()
+        chosen.refresh_from_db()
+        self.assertEqual(first.paid_amount, Decimal("0"))
+        self.assertTrue(chosen.is_paid)
+        self.assertEqual(chosen.paid_amount, Decimal("80000"))
+    
+    def pay(self, amount):
+        url = reverse('agent-record-payment', args=[self.agent.id])
+        data = {'agent_id': self.agent.id, 'amount': str(amount), 'payment_method': 'cash'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return len(queries)
+    
+    def test_record_payment_queries_do_not_grow_with_entries(self):
+        """Test settled ledger entries are written in one batched UPDATE"""
+        self.client.get(reverse('agent-list'))  # warm the token cache for both payments
+        for _ in range(2):
+            self.create_debt(Decimal("1000"))
+        few = self.pay(Decimal("2000"))
+        
+        for _ in range(40):
+            self.create_debt(Decimal("1000"))
+        many = self.pay(Decimal("40000"))
+        
+        self.assertEqual(many, few)
+        self.assertFalse(AgentLedger.objects.filter(is_paid=False).exists())
+    
+    def transfer(self, quantity, unit_price):
+        url = reverse('agent-transfer-stock', args=[self.agent.id])
+        data = {
+            'agent_id': self.agent.id,
+            'product_id': self.product.id,
+            'quantity': quantity,
+            'unit_price': str(unit_price)
+        }
+        return self.client.post(url, data, format='json')
+    
+    def test_transfer_stock_within_credit_limit(self):
+        """Test transfer creates ledger debt and moves stock to the field"""
+        response = self.transfer(5, Decimal("60000"))
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(AgentLedger.objects.filter(agent=self.agent).count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity_in_stock, 95)
+        self.assertEqual(self.product.quantity_in_field, 5)
+    
+    def test_transfer_stock_reports_debt_once(self):
+        """Test new_agent_debt counts the new entry once on top of existing debt"""
+        self.create_debt(Decimal("100000"))
+        
+        response = self.transfer(5, Decimal("60000"))
+        
+        self.assertEqual(Decimal(response.data['data']['new_agent_debt']), Decimal("400000"))
+    
+    def test_transfer_stock_rejected_when_limit_would_be_exceeded(self):
+        """Test transfer pushing debt past the credit limit is rejected"""
+        self.create_debt(Decimal("400000"))
+        
+        # Current debt is below the limit, but this transfer would cross it
+        response = self.transfer(2, Decimal("60000"))
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(AgentLedger.objects.filter(agent=self.agent).count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity_in_stock, 100)
@@ -4,13 +4,17 @@ Views for agents management
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db import transaction
-from django.db.models import Sum, Q
+from django.db.models import Sum, Count, Q, Value
+from django.db.models.functions import Coalesce
+from decimal import Decimal
 
+from apps.core.filters import TrigramSearchFilter
 from apps.core.permissions import IsCashierOrOwner, IsOwner
 from apps.inventory.models import Product, InventoryMovement
-from .models import Agent, AgentLedger, AgentPayment
+from .models import Agent, AgentDebtAging, AgentLedger, AgentPayment
 from .serializers import (
     AgentListSerializer, AgentDetailSerializer, AgentCreateUpdateSerializer,
     AgentLedgerSerializer, StockTransferSerializer,
@@ -18,17 +22,42 @@ from .serializers import (
 )
 
 
+class AgentCursorPagination(CursorPagination):
+    """Keyset pages over the indexed agent name instead of OFFSET scans"""
+    ordering = 'full_name'
+
+
+class LedgerCursorPagination(CursorPagination):
+    """Keyset pages over the indexed transfer date"""
+    ordering = '-transfer_date'
+
+
 class AgentViewSet(viewsets.ModelViewSet):
     """
     ViewSet for agent management
     """
     queryset = Agent.objects.select_related('created_by').all()
     permission_classes = [IsCashierOrOwner]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [TrigramSearchFilter, DjangoFilterBackend, filters.OrderingFilter]
     search_fields = ['full_name', 'phone_number', 'business_name', 'area']
+    search_index = 'agents_search'
     filterset_fields = ['is_active', 'is_trusted']
     ordering_fields = ['full_name', 'created_at', 'area']
     ordering = ['full_name']
+    pagination_class = AgentCursorPagination
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # Only the columns AgentListSerializer renders; skips the notes/address text
+            queryset = queryset.select_related(None).only(
+                'id', 'full_name', 'phone_number', 'business_name', 'area',
+                'credit_limit', 'outstanding_debt', 'is_active', 'is_trusted'
+            )
+        if self.action == 'retrieve':
+            # Aging buckets ride along in the same query as the agent row
+            queryset = queryset.annotate(**Agent.debt_by_age_annotations())
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -45,12 +74,17 @@ class AgentViewSet(viewsets.ModelViewSet):
         """Get debt summary for an agent"""
         agent = self.get_object()
         
-        unpaid_entries = agent.ledger_entries.filter(is_paid=False)
+        # Evaluated once; the count and aging buckets come from the fetched rows
+        unpaid_entries = list(
+            agent.ledger_entries.filter(is_paid=False)
+            .select_related('product', 'transferred_by')
+            .with_remaining_debt()
+        )
         
         summary = {
             'total_debt': agent.total_debt,
-            'debt_by_age': agent.get_debt_by_age(),
-            'unpaid_entries_count': unpaid_entries.count(),
+            'debt_by_age': agent.get_debt_by_age(unpaid_entries),
+            'unpaid_entries_count': len(unpaid_entries),
             'unpaid_entries': AgentLedgerSerializer(unpaid_entries, many=True).data
         }
         
@@ -59,21 +93,45 @@ class AgentViewSet(viewsets.ModelViewSet):
             'data': summary
         })
     
+    @action(detail=False, methods=['get'])
+    def debt_aging(self, request):
+        """Debt aging for all agents, read from the periodically refreshed snapshot"""
+        snapshot = AgentDebtAging.objects.select_related('agent').only(
+            'agent', 'refreshed_at', 'agent__full_name', *AgentDebtAging.BUCKET_FIELDS
+        ).order_by('agent__full_name')
+        
+        data = [
+            {
+                'agent_id': row.agent_id,
+                'agent_name': row.agent.full_name,
+                'debt_by_age': row.as_dict()
+            }
+            for row in snapshot
+        ]
+        
+        return Response({
+            'success': True,
+            'data': data,
+            'refreshed_at': snapshot[0].refreshed_at if data else None
+        })
+    
     @action(detail=True, methods=['post'])
     def transfer_stock(self, request, pk=None):
         """Transfer stock to agent"""
         agent = self.get_object()
         serializer = StockTransferSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        
-        data = serializer.validated_data
-        product = data['product']
-        quantity = data['quantity']
-        unit_price = data['unit_price']
-        debt_amount = data['debt_amount']
-        notes = data.get('notes', '')
         
         with transaction.atomic():
+            # Validation locks the agent and product rows until the transfer is written
+            serializer.is_valid(raise_exception=True)
+            
+            data = serializer.validated_data
+            product = data['product']
+            quantity = data['quantity']
+            unit_price = data['unit_price']
+            debt_amount = data['debt_amount']
+            notes = data.get('notes', '')
+            
             # Create inventory movement
             movement = InventoryMovement.objects.create(
                 product=product,
@@ -103,12 +161,15 @@ class AgentViewSet(viewsets.ModelViewSet):
             product.quantity_in_field += quantity
             product.save(update_fields=['quantity_in_stock', 'quantity_in_field', 'updated_at'])
         
+        # The ledger triggers have already added debt_amount to outstanding_debt
+        agent.refresh_from_db(fields=['outstanding_debt'])
+        
         return Response({
             'success': True,
             'message': 'Stock transferred successfully',
             'data': {
                 'ledger_entry': AgentLedgerSerializer(ledger_entry).data,
-                'new_agent_debt': agent.total_debt + debt_amount
+                'new_agent_debt': agent.total_debt
             }
         }, status=status.HTTP_201_CREATED)
     
@@ -127,6 +188,10 @@ class AgentViewSet(viewsets.ModelViewSet):
         specific_entries = data.get('ledger_entries', [])
         
         with transaction.atomic():
+            # Lock the agent row so concurrent payments settle its entries one after
+            # the other; skip_locked would let a payment jump the FIFO order instead
+            agent = Agent.objects.select_for_update().get(pk=agent.pk)
+            
             # Create payment record
             payment = AgentPayment.objects.create(
                 agent=agent,
@@ -137,48 +202,24 @@ class AgentViewSet(viewsets.ModelViewSet):
                 notes=notes
             )
             
-            # Apply payment to ledger entries
-            remaining_amount = amount
-            
-            if specific_entries:
-                # Apply to specific entries
-                entries = AgentLedger.objects.filter(
-                    id__in=specific_entries,
-                    agent=agent,
-                    is_paid=False
-                ).order_by('transfer_date')
-            else:
-                # Apply to oldest unpaid entries first (FIFO)
-                entries = AgentLedger.objects.filter(
-                    agent=agent,
-                    is_paid=False
-                ).order_by('transfer_date')
-            
-            updated_entries = []
-            for entry in entries:
-                if remaining_amount <= 0:
-                    break
-                
-                entry_remaining = entry.remaining_debt
-                payment_to_apply = min(remaining_amount, entry_remaining)
-                
-                entry.paid_amount += payment_to_apply
-                if entry.paid_amount >= entry.debt_amount:
-                    entry.is_paid = True
-                    entry.payment_date = payment.created_at
-                
-                entry.save(update_fields=['paid_amount', 'is_paid', 'payment_date', 'updated_at'])
-                remaining_amount -= payment_to_apply
-                updated_entries.append(entry)
+            # Apply payment to the oldest unpaid entries first (FIFO), optionally
+            # limited to specific entries, in one UPDATE
+            updated_count, amount_applied = AgentLedger.apply_payment(
+                agent.id, amount, payment.created_at, entry_ids=specific_entries
+            )
+        
+        # Raw UPDATE sends no post_save; triggers have moved outstanding_debt
+        Agent.invalidate_debt_cache(agent.id)
+        agent.refresh_from_db(fields=['outstanding_debt'])
         
         return Response({
             'success': True,
             'message': 'Payment recorded successfully',
             'data': {
                 'payment': AgentPaymentSerializer(payment).data,
-                'amount_applied': amount - remaining_amount,
-                'amount_remaining': remaining_amount,
-                'updated_entries_count': len(updated_entries),
+                'amount_applied': amount_applied,
+                'amount_remaining': amount - amount_applied,
+                'updated_entries_count': updated_count,
                 'new_total_debt': agent.total_debt
             }
         }, status=status.HTTP_201_CREATED)
@@ -190,13 +231,20 @@ class AgentLedgerViewSet(viewsets.ReadOnlyModelViewSet):
     """
     queryset = AgentLedger.objects.select_related(
         'agent', 'product', 'transferred_by'
-    ).all()
+    ).only(
+        # Ledger columns the serializer renders, and only the names from the joins
+        'id', 'agent', 'product', 'quantity', 'unit_price', 'debt_amount',
+        'transfer_date', 'is_paid', 'paid_amount', 'payment_date',
+        'inventory_movement_id', 'transferred_by', 'notes', 'created_at',
+        'agent__full_name', 'product__name', 'product__sku', 'transferred_by__full_name'
+    ).with_remaining_debt()
     serializer_class = AgentLedgerSerializer
     permission_classes = [IsCashierOrOwner]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['agent', 'product', 'is_paid']
     ordering_fields = ['transfer_date', 'created_at']
     ordering = ['-transfer_date']
+    pagination_class = LedgerCursorPagination
     
     @action(detail=False, methods=['get'])
     def unpaid(self, request):
@@ -209,13 +257,16 @@ class AgentLedgerViewSet(viewsets.ReadOnlyModelViewSet):
             entries = entries.filter(agent_id=agent_id)
         
         serializer = self.get_serializer(entries, many=True)
-        total_debt = entries.aggregate(total=Sum('debt_amount'))['total'] or 0
+        totals = entries.aggregate(
+            total=Coalesce(Sum('debt_amount'), Value(Decimal('0'))),
+            count=Count('id')
+        )
         
         return Response({
             'success': True,
             'data': serializer.data,
-            'total_debt': float(total_debt),
-            'count': entries.count()
+            'total_debt': float(totals['total']),
+            'count': totals['count']
         })
 
 
@@ -223,7 +274,10 @@ class AgentPaymentViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for agent payments (read-only)
     """
-    queryset = AgentPayment.objects.select_related('agent', 'received_by').all()
+    queryset = AgentPayment.objects.select_related('agent', 'received_by').only(
+        'id', 'agent', 'amount', 'payment_method', 'reference_number',
+        'received_by', 'notes', 'created_at', 'agent__full_name', 'received_by__full_name'
+    )
     serializer_class = AgentPaymentSerializer
     permission_classes = [IsCashierOrOwner]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -0,0 +1,110 @@
+"""
+AES-256-GCM encryption for backup files
+Uses cryptography's AESGCM (OpenSSL, AES-NI/PCLMULQDQ where available)
+"""
+import hashlib
+import os
+import struct
+import tempfile
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+MAGIC = b'EROMBAK1'
+KEY_SIZE = 32  # AES-256
+CHUNK_SIZE = 1024 * 1024  # 1 MiB per AESGCM call amortizes the Python overhead
+NONCE_PREFIX_SIZE = 8
+LENGTH = struct.Struct('>I')
+
+
+class BackupDecryptionError(Exception):
+    """Backup file is corrupt, truncated or was encrypted with another key"""
+
+
+def _cipher(key):
+    # AESGCM also accepts 128/192-bit keys; backups are AES-256 only
+    if len(key) != KEY_SIZE:
+        raise ValueError(f'Backup key must be {KEY_SIZE} bytes, got {len(key)}')
+    return AESGCM(key)
+
+
+def _nonce(prefix, index):
+    return prefix + LENGTH.pack(index)
+
+
+def _aad(index, is_final):
+    # Binding the chunk position and the last-chunk flag stops reordering and truncation
+    return struct.pack('>I?', index, is_final)
+
+
+def encrypt_file(source_path, dest_path, key):
+    """
+    Encrypt source_path into dest_path in 1 MiB AES-256-GCM chunks
+    Returns the SHA-256 of the written file, hashed in the same pass (BackupLog.checksum)
+    """
+    aes = _cipher(key)
+    prefix = os.urandom(NONCE_PREFIX_SIZE)
+    digest = hashlib.sha256()
+    
+    with open(source_path, 'rb') as source, open(dest_path, 'wb') as dest:
+        def write(data):
+            dest.write(data)
+            digest.update(data)
+        
+        write(MAGIC + prefix)
+        index = 0
+        chunk = source.read(CHUNK_SIZE)
+        while True:
+            next_chunk = source.read(CHUNK_SIZE)
+            is_final = not next_chunk
+            ciphertext = aes.encrypt(_nonce(prefix, index), chunk, _aad(index, is_final))
+            write(LENGTH.pack(len(ciphertext)) + ciphertext)
+            if is_final:
+                break
+            chunk = next_chunk
+            index += 1
+    
+    return digest.hexdigest()
+
+
+def decrypt_file(source_path, dest_path, key):
+    """
+    Decrypt a file written by encrypt_file; raises BackupDecryptionError if it was tampered with
+    Plaintext goes to a temporary file next to dest_path, which only replaces dest_path
+    once the final chunk has authenticated
+    """
+    aes = _cipher(key)
+    dest_dir, dest_name = os.path.split(os.path.abspath(dest_path))
+    fd, temp_path = tempfile.mkstemp(dir=dest_dir, prefix=f'.{dest_name}.', suffix='.tmp')
+    
+    try:
+        # Wrap the descriptor first so it is closed if opening the source fails
+        with os.fdopen(fd, 'wb') as dest, open(source_path, 'rb') as source:
+            _decrypt_chunks(aes, source, dest)
+        os.replace(temp_path, dest_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _decrypt_chunks(aes, source, dest):
+    header = source.read(len(MAGIC) + NONCE_PREFIX_SIZE)
+    if not header.startswith(MAGIC):
+        raise BackupDecryptionError('Not an EROM backup file')
+    prefix = header[len(MAGIC):]
+    
+    index = 0
+    while True:
+        length = source.read(LENGTH.size)
+        if len(length) != LENGTH.size:
+            raise BackupDecryptionError('Backup file is truncated')
+        ciphertext = source.read(LENGTH.unpack(length)[0])
+        
+        # Only the last chunk authenticates with is_final set
+        is_final = source.peek(1)[:1] == b''
+        try:
+            dest.write(aes.decrypt(_nonce(prefix, index), ciphertext, _aad(index, is_final)))
+        except InvalidTag as exc:
+            raise BackupDecryptionError('Backup file failed authentication') from exc
+        if is_final:
+            break
+        index += 1
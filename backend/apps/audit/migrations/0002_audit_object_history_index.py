@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-16 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audit", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="auditlog",
+            name="audit_log_model_n_c04ad8_idx",
+        ),
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=models.Index(
+                fields=["model_name", "object_id", "-created_at"],
+                name="idx_audit_object_history",
+            ),
+        ),
+    ]
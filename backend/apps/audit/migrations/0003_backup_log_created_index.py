@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-16 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audit", "0002_audit_object_history_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="backuplog",
+            index=models.Index(
+                fields=["-created_at"], name="backup_log_created_a2b67c_idx"
+            ),
+        ),
+    ]
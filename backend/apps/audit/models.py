@@ -5,6 +5,7 @@ Complete immutable audit trail of all system actions
 from django.db import models
 from django.utils import timezone
 from apps.core.models import TimeStampedModel, User
+import hashlib
 import json
 
 
@@ -49,7 +50,8 @@ class AuditLog(TimeStampedModel):
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['user', '-created_at']),
-            models.Index(fields=['model_name', 'object_id']),
+            # Object history lookups read newest first
+            models.Index(fields=['model_name', 'object_id', '-created_at'], name='idx_audit_object_history'),
             models.Index(fields=['action']),
         ]
     
@@ -61,6 +63,15 @@ class AuditLog(TimeStampedModel):
         """
         Helper method to create audit log entry
         """
+        entry = cls.build(user, action, model_name, object_id, before, after, notes, request)
+        entry.save()
+        return entry
+    
+    @classmethod
+    def build(cls, user, action, model_name, object_id, before=None, after=None, notes='', request=None):
+        """
+        Unsaved audit log entry, for callers that insert entries in bulk
+        """
         ip_address = None
         user_agent = ''
         
@@ -68,7 +79,7 @@ class AuditLog(TimeStampedModel):
             ip_address = request.META.get('REMOTE_ADDR')
             user_agent = request.META.get('HTTP_USER_AGENT', '')
         
-        return cls.objects.create(
+        return cls(
             user=user,
             action=action,
             model_name=model_name,
@@ -122,9 +133,25 @@ class BackupLog(TimeStampedModel):
     class Meta:
         db_table = 'backup_log'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at']),
+        ]
     
     def __str__(self):
         return f"Backup {self.created_at.strftime('%Y-%m-%d %H:%M')} - {self.status}"
+    
+    @staticmethod
+    def compute_checksum(file_path):
+        """
+        SHA-256 hex digest of a backup file
+        hashlib.file_digest hashes in C via OpenSSL (SHA-NI where available) without the GIL
+        """
+        with open(file_path, 'rb') as backup_file:
+            return hashlib.file_digest(backup_file, 'sha256').hexdigest()
+    
+    def verify_checksum(self):
+        """Check the backup file on disk still matches the recorded checksum"""
+        return self.compute_checksum(self.file_path) == self.checksum
 
 
 class SystemEvent(TimeStampedModel):
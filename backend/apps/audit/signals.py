@@ -2,15 +2,79 @@
 Signals for automatic audit logging
 Tracks all model changes
 """
+from django.conf import settings
+from django.db import models, transaction
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from django.core.serializers import serialize
-import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Audit entries queued for the current transaction, per thread and savepoint level
+_pending = threading.local()
+
+JSON_SAFE_TYPES = (str, int, float, bool, type(None))
+
+
+def snapshot_fields(instance):
+    """
+    JSON-safe {field name: value} of an instance's concrete fields (pk excluded)
+    Same shape as django.core.serializers' 'fields' without its JSON round trip,
+    except that binary fields (e.g. User.session_token_hash) are left out
+    """
+    state = {}
+    for field in instance._meta.concrete_fields:
+        # Raw bytes mean nothing in the log, and token digests must not end up there
+        if field.primary_key or isinstance(field, models.BinaryField):
+            continue
+        value = getattr(instance, field.attname)
+        if not isinstance(value, JSON_SAFE_TYPES):
+            # datetime/date/time -> ISO 8601; Decimal, UUID, files -> str
+            value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        state[field.name] = value
+    return state
 
 
 # We'll implement audit signals after all models are created
 # This prevents circular import issues
 
+def queue_audit_entry(entry):
+    """
+    Queue an unsaved AuditLog for one bulk INSERT when the transaction commits
+    Outside a transaction on_commit runs at once, so the entry is written immediately
+    """
+    connection = transaction.get_connection()
+    registered = {id(callback) for _, callback, _ in connection.run_on_commit}
+    
+    # One batch per savepoint level: rolling back a savepoint discards exactly the
+    # on_commit callbacks registered inside it, and with them the entries queued there
+    key = tuple(connection.savepoint_ids)
+    batches = getattr(_pending, 'batches', None)
+    if batches is None:
+        batches = _pending.batches = {}
+    batch = batches.get(key)
+    if batch is not None and id(batch['flush']) in registered:
+        batch['entries'].append(entry)
+        return
+    
+    # Drop batches whose flush was discarded by a rollback
+    for stale in [k for k, b in batches.items() if id(b['flush']) not in registered]:
+        del batches[stale]
+    
+    batch = {'entries': [entry]}
+    
+    def flush():
+        from apps.audit.models import AuditLog
+        if batches.get(key) is batch:
+            del batches[key]
+        AuditLog.objects.bulk_create(batch['entries'], batch_size=settings.BULK_BATCH_SIZE)
+    
+    batch['flush'] = flush
+    batches[key] = batch
+    transaction.on_commit(flush)
+
+
 def log_model_change(sender, instance, action, user=None, before_state=None):
     """
     Helper function to log model changes to audit log
@@ -25,21 +89,21 @@ def log_model_change(sender, instance, action, user=None, before_state=None):
     after_state = None
     if action != 'delete':
         try:
-            serialized = serialize('json', [instance])
-            after_state = json.loads(serialized)[0]['fields']
-        except:
+            after_state = snapshot_fields(instance)
+        except Exception:
+            logger.exception('Could not snapshot %s(%s) for audit log', sender.__name__, instance.pk)
             after_state = {'id': str(instance.pk)}
     
-    # Create audit log entry
+    # Queue audit log entry; written in bulk once the business write commits
     if user:
-        AuditLog.log_action(
+        queue_audit_entry(AuditLog.build(
             user=user,
             action=action,
             model_name=sender.__name__,
             object_id=instance.pk,
             before=before_state,
             after=after_state
-        )
+        ))
 
 
 # Signals will be connected in the ready() method of the app config
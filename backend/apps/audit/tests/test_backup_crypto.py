@@ -0,0 +1,103 @@
+"""
+Test cases for backup encryption
+"""
+import os
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from apps.audit import backup_crypto
+from apps.audit.backup_crypto import BackupDecryptionError, decrypt_file, encrypt_file
+from apps.audit.models import BackupLog
+
+
+class BackupCryptoTests(SimpleTestCase):
+    """Test chunked AES-256-GCM backup encryption"""
+    
+    def setUp(self):
+        self.key = AESGCM.generate_key(bit_length=256)
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        
+        self.plain = os.path.join(self.dir.name, 'db.sqlite3')
+        self.encrypted = os.path.join(self.dir.name, 'db.sqlite3.enc')
+        self.restored = os.path.join(self.dir.name, 'restored.sqlite3')
+        self.data = os.urandom(10000)
+        with open(self.plain, 'wb') as plain_file:
+            plain_file.write(self.data)
+    
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+    
+    def test_round_trip_across_chunks(self):
+        """Test multi-chunk backups decrypt to the original bytes"""
+        with mock.patch.object(backup_crypto, 'CHUNK_SIZE', 4096):
+            checksum = encrypt_file(self.plain, self.encrypted, self.key)
+        decrypt_file(self.encrypted, self.restored, self.key)
+        
+        self.assertEqual(self.read(self.restored), self.data)
+        self.assertNotIn(self.data[:64], self.read(self.encrypted))
+        self.assertEqual(checksum, BackupLog.compute_checksum(self.encrypted))
+    
+    def test_wrong_key_rejected(self):
+        """Test decrypting with another key fails authentication"""
+        encrypt_file(self.plain, self.encrypted, self.key)
+        
+        with self.assertRaises(BackupDecryptionError):
+            decrypt_file(self.encrypted, self.restored, AESGCM.generate_key(bit_length=256))
+    
+    def test_non_256_bit_key_rejected(self):
+        """Test keys other than 32 bytes are refused in both directions"""
+        short_key = AESGCM.generate_key(bit_length=128)
+        
+        with self.assertRaises(ValueError):
+            encrypt_file(self.plain, self.encrypted, short_key)
+        encrypt_file(self.plain, self.encrypted, self.key)
+        with self.assertRaises(ValueError):
+            decrypt_file(self.encrypted, self.restored, short_key)
+        self.assertFalse(os.path.exists(self.restored))
+    
+    def test_missing_backup_leaves_no_temp_file(self):
+        """Test a source that cannot be opened cleans up the temporary file"""
+        with self.assertRaises(FileNotFoundError):
+            decrypt_file(os.path.join(self.dir.name, 'missing.enc'), self.restored, self.key)
+        
+        self.assertEqual(os.listdir(self.dir.name), ['db.sqlite3'])
+    
+    def test_tampered_backup_leaves_destination_untouched(self):
+        """Test a failed decrypt neither writes plaintext to nor replaces the destination"""
+        with mock.patch.object(backup_crypto, 'CHUNK_SIZE', 4096):
+            encrypt_file(self.plain, self.encrypted, self.key)
+        
+        # Corrupt the last chunk so the earlier ones decrypt before the failure
+        data = bytearray(self.read(self.encrypted))
+        data[-1] ^= 1
+        with open(self.encrypted, 'wb') as f:
+            f.write(data)
+        with open(self.restored, 'wb') as f:
+            f.write(b'previous restore')
+        
+        with self.assertRaises(BackupDecryptionError):
+            decrypt_file(self.encrypted, self.restored, self.key)
+        
+        self.assertEqual(self.read(self.restored), b'previous restore')
+        self.assertEqual(
+            sorted(os.listdir(self.dir.name)),
+            ['db.sqlite3', 'db.sqlite3.enc', 'restored.sqlite3']
+        )
+    
+    def test_truncated_backup_rejected(self):
+        """Test dropping trailing chunks is detected"""
+        with mock.patch.object(backup_crypto, 'CHUNK_SIZE', 4096):
+            encrypt_file(self.plain, self.encrypted, self.key)
+        
+        # Keep the header and the first chunk only
+        data = self.read(self.encrypted)
+        first_chunk_end = 16 + 4 + 4096 + 16
+        with open(self.encrypted, 'wb') as f:
+            f.write(data[:first_chunk_end])
+        
+        with self.assertRaises(BackupDecryptionError):
+            decrypt_file(self.encrypted, self.restored, self.key)
+        self.assertFalse(os.path.exists(self.restored))
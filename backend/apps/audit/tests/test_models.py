@@ -0,0 +1,45 @@
+"""
+Test cases for audit models
+"""
+import hashlib
+import os
+import tempfile
+from django.test import TestCase
+from apps.core.models import User
+from apps.audit.models import BackupLog
+
+
+class BackupLogTests(TestCase):
+    """Test backup checksum helpers"""
+    
+    def setUp(self):
+        self.user = User.objects.create(
+            username="owner",
+            full_name="Owner",
+            role=User.OWNER
+        )
+        
+        handle, self.path = tempfile.mkstemp(suffix='.bak')
+        with os.fdopen(handle, 'wb') as backup_file:
+            backup_file.write(b'erom backup ' * 10000)
+        self.addCleanup(os.remove, self.path)
+    
+    def test_checksum_matches_sha256(self):
+        """Test checksum is the SHA-256 hex digest of the file"""
+        expected = hashlib.sha256(b'erom backup ' * 10000).hexdigest()
+        self.assertEqual(BackupLog.compute_checksum(self.path), expected)
+    
+    def test_verify_checksum_detects_changes(self):
+        """Test a modified backup file fails verification"""
+        backup = BackupLog.objects.create(
+            backup_type='manual',
+            file_path=self.path,
+            file_size_bytes=os.path.getsize(self.path),
+            checksum=BackupLog.compute_checksum(self.path),
+            created_by=self.user
+        )
+        self.assertTrue(backup.verify_checksum())
+        
+        with open(self.path, 'ab') as backup_file:
+            backup_file.write(b'tampered')
+        self.assertFalse(backup.verify_checksum())
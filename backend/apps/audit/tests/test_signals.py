@@ -0,0 +1,105 @@
+"""
+Test cases for audit logging helpers
+"""
+import json
+from django.core.serializers import serialize
+from django.db import transaction
+from django.test import TestCase
+from decimal import Decimal
+from apps.core.models import User
+from apps.agents.models import Agent
+from apps.audit.models import AuditLog
+from apps.audit.signals import log_model_change, snapshot_fields
+
+
+class AuditSnapshotTests(TestCase):
+    """Test audit state snapshots"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username="owner",
+            full_name="Owner",
+            role=User.OWNER
+        )
+        cls.agent = Agent.objects.create(
+            full_name="John Tech",
+            phone_number="+250788123456",
+            credit_limit=Decimal("500000"),
+            created_by=cls.user
+        )
+    
+    def test_snapshot_matches_serializer_fields(self):
+        """Test snapshot has the same keys and values as the JSON serializer"""
+        agent = Agent.objects.get(pk=self.agent.pk)
+        expected = json.loads(serialize('json', [agent]))[0]['fields']
+        
+        state = snapshot_fields(agent)
+        
+        self.assertEqual(state.keys(), expected.keys())
+        self.assertEqual(state['created_by'], self.user.pk)
+        self.assertEqual(Decimal(state['credit_limit']), Decimal("500000"))
+        self.assertEqual(state['full_name'], "John Tech")
+        json.dumps(state)  # must be JSON-safe as is
+    
+    def test_snapshot_skips_binary_fields(self):
+        """Test session token digests are kept out of the audit snapshot"""
+        self.user.generate_session_token()
+        user = User.objects.get(pk=self.user.pk)
+        
+        state = snapshot_fields(user)
+        
+        self.assertNotIn('session_token_hash', state)
+        self.assertEqual(state['username'], "owner")
+        json.dumps(state)
+    
+    def test_log_model_change_stores_snapshot(self):
+        """Test audit entry records the after state of the instance"""
+        with self.captureOnCommitCallbacks(execute=True):
+            log_model_change(Agent, self.agent, 'update', user=self.user)
+        
+        entry = AuditLog.objects.get(model_name='Agent', object_id=str(self.agent.pk))
+        self.assertEqual(entry.action, 'update')
+        self.assertEqual(entry.after_state['phone_number'], "+250788123456")
+    
+    def test_entries_flushed_in_bulk_on_commit(self):
+        """Test audit entries wait for commit and are inserted together"""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertNumQueries(0):
+                log_model_change(Agent, self.agent, 'update', user=self.user)
+                log_model_change(Agent, self.agent, 'update', user=self.user)
+        
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(AuditLog.objects.filter(model_name='Agent').count(), 2)
+    
+    def test_rolled_back_entries_not_written(self):
+        """Test entries queued in a rolled back transaction are dropped"""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    log_model_change(Agent, self.agent, 'update', user=self.user)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            log_model_change(Agent, self.agent, 'delete', user=self.user)
+        
+        entry = AuditLog.objects.get(model_name='Agent')
+        self.assertEqual(entry.action, 'delete')
+    
+    def test_savepoint_rollback_drops_only_its_entries(self):
+        """Test entries queued in a rolled back inner atomic() are dropped, outer ones kept"""
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                log_model_change(Agent, self.agent, 'update', user=self.user)
+                try:
+                    with transaction.atomic():
+                        log_model_change(Agent, self.agent, 'delete', user=self.user)
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                with transaction.atomic():
+                    log_model_change(Agent, self.agent, 'create', user=self.user)
+                log_model_change(Agent, self.agent, 'update', user=self.user)
+        
+        actions = sorted(AuditLog.objects.filter(model_name='Agent').values_list('action', flat=True))
+        self.assertEqual(actions, ['create', 'update', 'update'])
@@ -2,9 +2,30 @@
 Custom authentication for desktop app
 Token-based authentication without external dependencies
 """
+import hmac
 from rest_framework import authentication, exceptions
+from django.conf import settings
+from django.core.cache import caches
 from django.utils import timezone
-from .models import User
+from .models import User, hash_session_token
+
+
+def get_auth_cache():
+    """Cache backend holding authenticated users per token (AUTH_USER_CACHE_ALIAS)"""
+    return caches[settings.AUTH_USER_CACHE_ALIAS]
+
+
+def token_cache_key(token_hash):
+    return 'auth:token:' + token_hash.hex()
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """Drop the cached user so the next request re-reads it (see core.signals)"""
+    get_auth_cache().delete(user_cache_key(user_id))
 
 
 class DesktopTokenAuthentication(authentication.BaseAuthentication):
@@ -19,12 +40,18 @@ class DesktopTokenAuthentication(authentication.BaseAuthentication):
         if not auth_header.startswith('Token '):
             return None
         
-        token = auth_header.split(' ')[1]
+        # Only the digest is looked up, compared or cached; raw tokens are never stored
+        token_hash = hash_session_token(auth_header.split(' ')[1])
+        user = self.get_cached_user(token_hash)
         
-        try:
-            user = User.objects.get(session_token=token, is_active=True)
-        except User.DoesNotExist:
-            raise exceptions.AuthenticationFailed('Invalid token')
+        if user is None:
+            try:
+                user = User.objects.get(session_token_hash=token_hash, is_active=True)
+            except User.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token')
+            if not hmac.compare_digest(bytes(user.session_token_hash), token_hash):
+                raise exceptions.AuthenticationFailed('Invalid token')
+            self.cache_user(token_hash, user)
         
         # Check if token expired
         if not user.is_session_valid():
@@ -32,5 +59,29 @@ class DesktopTokenAuthentication(authentication.BaseAuthentication):
         
         return (user, None)
     
+    def get_cached_user(self, token_hash):
+        """
+        User for the token from the cache, or None on a miss
+        The user entry is dropped on every User save, so a logout or new login
+        shows up here as a token mismatch and falls back to the database
+        """
+        auth_cache = get_auth_cache()
+        user_id = auth_cache.get(token_cache_key(token_hash))
+        if user_id is None:
+            return None
+        user = auth_cache.get(user_cache_key(user_id))
+        if user is None or not user.is_active or not user.session_token_hash:
+            return None
+        if not hmac.compare_digest(bytes(user.session_token_hash), token_hash):
+            return None
+        return user
+    
+    def cache_user(self, token_hash, user):
+        timeout = settings.AUTH_USER_CACHE_TIMEOUT
+        if user.session_expires_at:
+            remaining = (user.session_expires_at - timezone.now()).total_seconds()
+            timeout = min(timeout, max(int(remaining), 1))
+        get_auth_cache().set_many({token_cache_key(token_hash): user.pk, user_cache_key(user.pk): user}, timeout)
+    
     def authenticate_header(self, request):
         return 'Token'
@@ -0,0 +1,54 @@
+"""
+Snapshot of the seeded demo database (SQLite only)
+dump_demo_snapshot writes it once; create_demo_data --from-snapshot copies it back
+"""
+import os
+import sqlite3
+from django.conf import settings
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+
+
+class SnapshotError(Exception):
+    """Snapshot missing, stale, or the database is not SQLite"""
+
+
+def _require_sqlite():
+    if connection.vendor != 'sqlite':
+        raise SnapshotError('Demo snapshots are only supported on SQLite')
+    connection.ensure_connection()
+
+
+def disk_migrations():
+    """(app, name) of every migration in the code base"""
+    return set(MigrationLoader(None, ignore_no_migrations=True).disk_migrations)
+
+
+def save_snapshot(path=None):
+    """Copy the current database into the snapshot file with SQLite's online backup"""
+    _require_sqlite()
+    dest = sqlite3.connect(path or settings.DEMO_SNAPSHOT_PATH)
+    try:
+        connection.connection.backup(dest)
+    finally:
+        dest.close()
+
+
+def restore_snapshot(path=None):
+    """
+    Overwrite the current database with the snapshot, page for page
+    Refused when the snapshot's applied migrations differ from the code's
+    """
+    _require_sqlite()
+    path = path or settings.DEMO_SNAPSHOT_PATH
+    if not os.path.exists(path):
+        raise SnapshotError(f'No demo snapshot at {path}. Run dump_demo_snapshot first.')
+    
+    source = sqlite3.connect(path)
+    try:
+        applied = set(source.execute('SELECT app, name FROM django_migrations'))
+        if applied != disk_migrations():
+            raise SnapshotError('Demo snapshot is out of date with the migrations. Run dump_demo_snapshot again.')
+        source.backup(connection.connection)
+    finally:
+        source.close()
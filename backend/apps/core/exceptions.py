@@ -2,7 +2,6 @@
 Custom exception handler for REST API
 """
 from rest_framework.views import exception_handler
-from rest_framework.response import Response
 
 
 def custom_exception_handler(exc, context):
@@ -12,15 +11,16 @@ def custom_exception_handler(exc, context):
     response = exception_handler(exc, context)
     
     if response is not None:
-        # Standardize error format
-        custom_response = {
+        # Standardize error format on DRF's response rather than building a second
+        # one, which also keeps its headers (WWW-Authenticate, Retry-After, Allow)
+        details = response.data
+        response.data = {
             'success': False,
             'error': {
                 'message': str(exc),
                 'code': response.status_code,
-                'details': response.data if isinstance(response.data, dict) else {'detail': response.data}
+                'details': details if isinstance(details, dict) else {'detail': details}
             }
         }
-        return Response(custom_response, status=response.status_code)
     
     return response
@@ -0,0 +1,97 @@
+"""
+Sparse fieldsets: ?fields=a,b renders only those serializer fields and
+loads only the columns they read
+"""
+from django.core.exceptions import FieldDoesNotExist
+
+FIELDS_PARAM = 'fields'
+
+
+class SparseFieldsSerializerMixin:
+    """
+    ModelSerializer taking an optional `fields` argument naming the subset of
+    Meta.fields to render. Fields backed by model properties list the columns
+    they read in Meta.property_sources so the view can still narrow the query.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+    
+    def get_only_fields(self):
+        """
+        (columns, relations) to load for the current fields, or None when a
+        field reads something that cannot be mapped to model columns
+        """
+        model = self.Meta.model
+        property_sources = getattr(self.Meta, 'property_sources', {})
+        columns, relations = set(), set()
+        
+        for name, field in self.fields.items():
+            attrs = field.source_attrs
+            if not attrs:  # source='*'
+                return None
+            if name in property_sources:
+                columns.update(property_sources[name])
+                continue
+            try:
+                model_field = model._meta.get_field(attrs[0])
+            except FieldDoesNotExist:
+                return None
+            if len(attrs) == 1 and model_field.concrete:
+                columns.add(attrs[0])
+            elif len(attrs) == 2 and model_field.many_to_one and _is_column(model_field.related_model, attrs[1]):
+                # category.name: the FK column plus one column of the joined row
+                columns.update([attrs[0], '__'.join(attrs)])
+                relations.add(attrs[0])
+            else:
+                return None
+        return columns, relations
+
+
+def _is_column(model, name):
+    try:
+        return model._meta.get_field(name).concrete
+    except FieldDoesNotExist:
+        return False
+
+
+class SparseFieldsViewMixin:
+    """
+    ViewSet mixin applying ?fields= to read actions whose serializer uses
+    SparseFieldsSerializerMixin; unknown names are ignored
+    """
+    
+    def get_requested_fields(self):
+        if self.request.method != 'GET' or FIELDS_PARAM not in self.request.query_params:
+            return None
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, SparseFieldsSerializerMixin):
+            return None
+        requested = set(self.request.query_params[FIELDS_PARAM].split(','))
+        return [name for name in serializer_class.Meta.fields if name in requested] or None
+    
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+    
+    def filter_queryset(self, queryset):
+        # Applied last, after get_queryset's own select_related/only for the action
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_requested_fields()
+        if fields is None:
+            return queryset
+        
+        only = self.get_serializer_class()(fields=fields).get_only_fields()
+        if only is None:
+            return queryset
+        columns, relations = only
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        return queryset.only(*columns)
@@ -0,0 +1,39 @@
+"""
+Search helpers backed by SQLite FTS5 trigram tables
+Each table is created and kept in sync by its app's migrations (agents 0007, inventory 0003)
+"""
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+# The trigram tokenizer cannot match anything shorter than three characters
+MIN_TERM_LENGTH = 3
+
+
+def can_use_trigram_index(terms):
+    return connection.vendor == 'sqlite' and bool(terms) and min(len(term) for term in terms) >= MIN_TERM_LENGTH
+
+
+def trigram_condition(table, terms, columns=None):
+    """
+    Q for rows whose FTS5 entry contains every term as a case-insensitive substring
+    Each term may match any indexed column, or only `columns` when given
+    """
+    match = ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+    if columns:
+        match = '{%s} : (%s)' % (' '.join(columns), match)
+    return Q(id__in=RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [match]))
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+    """
+    On SQLite, answer search from the view's search_index FTS5 trigram table
+    Terms shorter than a trigram, and other databases, use the regular icontains search
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not can_use_trigram_index(terms):
+            return super().filter_queryset(request, queryset, view)
+        return queryset.filter(trigram_condition(view.search_index, terms))
@@ -1,7 +1,10 @@
 """
 Management command to create demo/test data
 """
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.core.demo_snapshot import SnapshotError, restore_snapshot
 from apps.core.models import User
 from apps.inventory.models import Brand, Category, Model, Product
 from apps.agents.models import Agent
@@ -10,18 +13,50 @@ from apps.agents.models import Agent
 class Command(BaseCommand):
     help = 'Create demo data for testing'
     
+    def create_missing(self, model, objs, existing_keys, key, label):
+        """
+        Insert the objs whose natural key(obj) is not in existing_keys with one bulk INSERT
+        ignore_conflicts keeps a concurrent or repeated run from failing on unique keys
+        Returns the number of rows sent; a re-run with nothing missing makes no query
+        """
+        new_objs = [obj for obj in objs if key(obj) not in existing_keys]
+        model.objects.bulk_create(
+            new_objs, ignore_conflicts=True, batch_size=settings.BULK_BATCH_SIZE
+        )
+        if self.verbosity:
+            self.created_lines.extend(f'  ✓ {label(obj)}' for obj in new_objs)
+        return len(new_objs)
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-snapshot', action='store_true',
+            help='Replace the database with the dump_demo_snapshot copy instead of seeding'
+        )
+    
     def handle(self, *args, **options):
-        # Get owner user
+        self.verbosity = options['verbosity']
+        if not options['from_snapshot']:
+            return self.seed()
+        
         try:
-            owner = User.objects.filter(role=User.OWNER).first()
-            if not owner:
-                self.stdout.write(self.style.ERROR('No owner found. Run setup_shop first.'))
-                return
-        except:
-            self.stdout.write(self.style.ERROR('Run setup_shop first.'))
+            restore_snapshot()
+        except SnapshotError as exc:
+            self.stdout.write(self.style.ERROR(str(exc)))
+            return
+        self.stdout.write(self.style.SUCCESS('✓ Demo data restored from snapshot'))
+    
+    # The whole seed commits once instead of once per INSERT
+    @transaction.atomic
+    def seed(self):
+        # Get owner user; only used as created_by, so the primary key is all that is needed
+        owner = User.objects.filter(role=User.OWNER).only('id').first()
+        if owner is None:
+            self.stdout.write(self.style.ERROR('No owner found. Run setup_shop first.'))
             return
         
         self.stdout.write('Creating demo data...\n')
+        # Written out in one go once everything is inserted
+        self.created_lines = []
         
         # Create categories
         categories_data = [
@@ -32,24 +67,30 @@ class Command(BaseCommand):
             {'name': 'Speakers & Microphones', 'description': 'Audio components'},
         ]
         
-        categories = {}
-        for cat_data in categories_data:
-            cat, created = Category.objects.get_or_create(
-                name=cat_data['name'],
-                defaults={'description': cat_data['description']}
-            )
-            categories[cat.name] = cat
-            if created:
-                self.stdout.write(f'  ✓ Category: {cat.name}')
+        # Rows already present double as the lookup; re-read only when some were inserted
+        # (ignore_conflicts leaves the new instances without primary keys)
+        category_names = [c['name'] for c in categories_data]
+        categories = Category.objects.in_bulk(category_names, field_name='name')
+        if self.create_missing(
+            Category,
+            [Category(name=c['name'], description=c['description']) for c in categories_data],
+            categories,
+            key=lambda cat: cat.name,
+            label=lambda cat: f'Category: {cat.name}'
+        ):
+            categories = Category.objects.in_bulk(category_names, field_name='name')
         
         # Create brands
         brands_data = ['Samsung', 'Apple', 'Tecno', 'Infinix', 'Xiaomi', 'Oppo']
-        brands = {}
-        for brand_name in brands_data:
-            brand, created = Brand.objects.get_or_create(name=brand_name)
-            brands[brand_name] = brand
-            if created:
-                self.stdout.write(f'  ✓ Brand: {brand_name}')
+        brands = Brand.objects.in_bulk(brands_data, field_name='name')
+        if self.create_missing(
+            Brand,
+            [Brand(name=name) for name in brands_data],
+            brands,
+            key=lambda brand: brand.name,
+            label=lambda brand: f'Brand: {brand.name}'
+        ):
+            brands = Brand.objects.in_bulk(brands_data, field_name='name')
         
         # Create phone models
         models_data = [
@@ -63,16 +104,28 @@ class Command(BaseCommand):
             {'brand': 'Infinix', 'name': 'Hot 30', 'year': 2023},
         ]
         
-        phone_models = {}
-        for model_data in models_data:
-            model, created = Model.objects.get_or_create(
-                brand=brands[model_data['brand']],
-                name=model_data['name'],
-                defaults={'release_year': model_data['year']}
-            )
-            phone_models[f"{model_data['brand']} {model_data['name']}"] = model
-            if created:
-                self.stdout.write(f'  ✓ Model: {model_data["brand"]} {model_data["name"]}')
+        # (brand, name) is unique together, so models are keyed on both
+        def existing_models():
+            return {
+                (model.brand_id, model.name): model
+                for model in Model.objects.filter(brand__in=brands.values()).select_related('brand')
+            }
+        
+        phone_models = existing_models()
+        if self.create_missing(
+            Model,
+            [
+                Model(brand=brands[m['brand']], name=m['name'], release_year=m['year'])
+                for m in models_data
+            ],
+            phone_models,
+            key=lambda model: (model.brand_id, model.name),
+            label=lambda model: f'Model: {model.brand.name} {model.name}'
+        ):
+            phone_models = existing_models()
+        phone_models = {
+            f'{model.brand.name} {model.name}': model for model in phone_models.values()
+        }
         
         # Create products
         products_data = [
@@ -92,24 +145,29 @@ class Command(BaseCommand):
             {'sku': 'TC20-CHG-001', 'name': 'Camon 20 Charging Port', 'model': 'Tecno Camon 20', 'category': 'Charging Ports', 'cost': 5000, 'price': 10000, 'stock': 40},
         ]
         
-        for prod_data in products_data:
-            model_key = prod_data['model']
-            prod, created = Product.objects.get_or_create(
-                sku=prod_data['sku'],
-                defaults={
-                    'name': prod_data['name'],
-                    'category': categories[prod_data['category']],
-                    'phone_model': phone_models[model_key],
-                    'brand': phone_models[model_key].brand,
-                    'cost_price': prod_data['cost'],
-                    'selling_price': prod_data['price'],
-                    'quantity_in_stock': prod_data['stock'],
-                    'reorder_level': 5,
-                    'created_by': owner
-                }
-            )
-            if created:
-                self.stdout.write(f'  ✓ Product: {prod.name} ({prod.sku})')
+        self.create_missing(
+            Product,
+            [
+                Product(
+                    sku=p['sku'],
+                    name=p['name'],
+                    category=categories[p['category']],
+                    phone_model=phone_models[p['model']],
+                    brand=phone_models[p['model']].brand,
+                    cost_price=p['cost'],
+                    selling_price=p['price'],
+                    quantity_in_stock=p['stock'],
+                    reorder_level=5,
+                    created_by=owner
+                )
+                for p in products_data
+            ],
+            set(Product.objects.filter(
+                sku__in=[p['sku'] for p in products_data]
+            ).values_list('sku', flat=True)),
+            key=lambda prod: prod.sku,
+            label=lambda prod: f'Product: {prod.name} ({prod.sku})'
+        )
         
         # Create demo agents
         agents_data = [
@@ -118,24 +176,38 @@ class Command(BaseCommand):
             {'name': 'Patrick Tech', 'phone': '+250788555666', 'area': 'Remera', 'credit': 400000},
         ]
         
-        for agent_data in agents_data:
-            agent, created = Agent.objects.get_or_create(
-                phone_number=agent_data['phone'],
-                defaults={
-                    'full_name': agent_data['name'],
-                    'area': agent_data['area'],
-                    'credit_limit': agent_data['credit'],
-                    'is_active': True,
-                    'created_by': owner
-                }
-            )
-            if created:
-                self.stdout.write(f'  ✓ Agent: {agent.full_name} ({agent.area})')
+        # phone_number is not unique, so the existing-number check is what dedupes agents
+        self.create_missing(
+            Agent,
+            [
+                Agent(
+                    phone_number=a['phone'],
+                    full_name=a['name'],
+                    area=a['area'],
+                    credit_limit=a['credit'],
+                    is_active=True,
+                    created_by=owner
+                )
+                for a in agents_data
+            ],
+            set(Agent.objects.filter(
+                phone_number__in=[a['phone'] for a in agents_data]
+            ).values_list('phone_number', flat=True)),
+            key=lambda agent: agent.phone_number,
+            label=lambda agent: f'Agent: {agent.full_name} ({agent.area})'
+        )
         
+        if self.created_lines:
+            self.stdout.write('\n'.join(self.created_lines))
         self.stdout.write(self.style.SUCCESS('\n✓ Demo data created successfully!'))
-        self.stdout.write('\nSummary:')
-        self.stdout.write(f'  Categories: {Category.objects.count()}')
-        self.stdout.write(f'  Brands: {Brand.objects.count()}')
-        self.stdout.write(f'  Phone Models: {Model.objects.count()}')
-        self.stdout.write(f'  Products: {Product.objects.count()}')
-        self.stdout.write(f'  Agents: {Agent.objects.count()}')
+        if not self.verbosity:
+            return
+        
+        self.stdout.write('\n'.join([
+            '\nSummary:',
+            f'  Categories: {Category.objects.count()}',
+            f'  Brands: {Brand.objects.count()}',
+            f'  Phone Models: {Model.objects.count()}',
+            f'  Products: {Product.objects.count()}',
+            f'  Agents: {Agent.objects.count()}',
+        ]))
@@ -0,0 +1,22 @@
+"""
+Management command to seed the demo database and save it as a snapshot
+"""
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from apps.core.demo_snapshot import SnapshotError, save_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Seed demo data and save the database for create_demo_data --from-snapshot'
+    
+    def handle(self, *args, **options):
+        call_command('setup_shop', stdout=self.stdout)
+        call_command('create_demo_data', stdout=self.stdout)
+        
+        try:
+            save_snapshot()
+        except SnapshotError as exc:
+            self.stdout.write(self.style.ERROR(str(exc)))
+            return
+        
+        self.stdout.write(self.style.SUCCESS('\n✓ Demo snapshot saved'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-16 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="session_token",
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-16 02:54
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_tokens(apps, schema_editor):
+    # Keep current sessions valid across the upgrade
+    User = apps.get_model("core", "User")
+    for user in User.objects.exclude(session_token="").only("pk", "session_token"):
+        user.session_token_hash = hashlib.blake2b(
+            user.session_token.encode(), digest_size=16
+        ).digest()
+        user.save(update_fields=["session_token_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_user_session_token_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="session_token_hash",
+            field=models.BinaryField(db_index=True, max_length=16, null=True),
+        ),
+        migrations.RunPython(hash_existing_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="user",
+            name="session_token",
+        ),
+    ]
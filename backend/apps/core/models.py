@@ -2,11 +2,43 @@
 Core models for EROM System
 Base models for user management and shop configuration
 """
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 from django.utils import timezone
 from argon2 import PasswordHasher
+from functools import lru_cache
+import hashlib
 import secrets
 
+# Shared by every User; PasswordHasher is stateless once its parameters are set
+_password_hasher = PasswordHasher(**settings.ARGON2_PARAMS)
+
+
+SHOP_CACHE_KEY = 'shop:current'
+
+
+@lru_cache(maxsize=1)
+def _dummy_password_hash():
+    return _password_hasher.hash(secrets.token_urlsafe(16))
+
+
+def verify_dummy_password(raw_password):
+    """
+    Spend a real password check's Argon2 work when no user matched, so a
+    failed login takes as long for an unknown username as for a wrong password
+    """
+    try:
+        _password_hasher.verify(_dummy_password_hash(), raw_password)
+    except Exception:
+        pass
+    return False
+
+
+def hash_session_token(token):
+    """16-byte blake2b digest stored and indexed in place of the raw session token"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
 
 class TimeStampedModel(models.Model):
     """
@@ -51,6 +83,11 @@ class Shop(TimeStampedModel):
     
     def __str__(self):
         return self.name
+    
+    @classmethod
+    def current(cls):
+        """The installation's shop (None before setup), cached until a Shop is saved or deleted"""
+        return cache.get_or_set(SHOP_CACHE_KEY, cls.objects.first, settings.SHOP_CACHE_TIMEOUT)
 
 
 class User(TimeStampedModel):
@@ -74,8 +111,8 @@ class User(TimeStampedModel):
     is_active = models.BooleanField(default=True)
     last_login = models.DateTimeField(null=True, blank=True)
     
-    # Current session token (single device login)
-    session_token = models.CharField(max_length=100, blank=True)
+    # Current session token (single device login), stored hashed only
+    session_token_hash = models.BinaryField(max_length=16, null=True, db_index=True)
     session_expires_at = models.DateTimeField(null=True, blank=True)
     
     # Required by Django's AUTH_USER_MODEL
@@ -101,18 +138,16 @@ class User(TimeStampedModel):
         """
         Hash password using Argon2
         """
-        ph = PasswordHasher()
-        self.password_hash = ph.hash(raw_password)
+        self.password_hash = _password_hasher.hash(raw_password)
     
     def check_password(self, raw_password):
         """
         Verify password against hash
         """
-        ph = PasswordHasher()
         try:
-            ph.verify(self.password_hash, raw_password)
+            _password_hasher.verify(self.password_hash, raw_password)
             # Rehash if parameters changed
-            if ph.check_needs_rehash(self.password_hash):
+            if _password_hasher.check_needs_rehash(self.password_hash):
                 self.set_password(raw_password)
                 self.save(update_fields=['password_hash'])
             return True
@@ -123,17 +158,44 @@ class User(TimeStampedModel):
         """
         Generate a new session token
         """
-        self.session_token = secrets.token_urlsafe(32)
-        self.session_expires_at = timezone.now() + timezone.timedelta(hours=12)
-        self.last_login = timezone.now()
-        self.save(update_fields=['session_token', 'session_expires_at', 'last_login'])
-        return self.session_token
+        from .authentication import invalidate_cached_user
+        
+        token = secrets.token_urlsafe(32)
+        now = timezone.now()
+        self.session_token_hash = hash_session_token(token)
+        self.session_expires_at = now + timezone.timedelta(hours=12)
+        self.last_login = now
+        
+        # Runs on every login: one UPDATE, without save()'s signal dispatch
+        User.objects.filter(pk=self.pk).update(
+            session_token_hash=self.session_token_hash,
+            session_expires_at=self.session_expires_at,
+            last_login=now
+        )
+        # post_save would have dropped the cached user; the old token must stop working
+        invalidate_cached_user(self.pk)
+        return token
+    
+    def clear_session(self):
+        """
+        End the current session (logout)
+        """
+        from .authentication import get_auth_cache, invalidate_cached_user, token_cache_key
+        
+        if self.session_token_hash:
+            get_auth_cache().delete(token_cache_key(bytes(self.session_token_hash)))
+        self.session_token_hash = None
+        self.session_expires_at = None
+        
+        # Same single UPDATE as generate_session_token, so the cached user is dropped here
+        User.objects.filter(pk=self.pk).update(session_token_hash=None, session_expires_at=None)
+        invalidate_cached_user(self.pk)
     
     def is_session_valid(self):
         """
         Check if current session token is valid
         """
-        if not self.session_token or not self.session_expires_at:
+        if not self.session_token_hash or not self.session_expires_at:
             return False
         return timezone.now() < self.session_expires_at
     
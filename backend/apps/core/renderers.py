@@ -0,0 +1,52 @@
+"""
+orjson-backed JSON renderer for REST API responses, and a CSV renderer for
+actions that stream their own CSV body
+"""
+import csv
+import io
+
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Datetimes, Decimals and lazy strings fall back to DRF's encoder so the
+# wire format (millisecond 'Z' timestamps, decimals as numbers) is unchanged
+_fallback = JSONEncoder().default
+
+OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in JSONRenderer that encodes with orjson"""
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        
+        options = OPTIONS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_fallback, option=options)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Lets `Accept: text/csv` through content negotiation on CSV export actions
+    Those actions stream their own body, so the only data rendered here is an
+    error payload (see apps.core.exceptions), written as a single 'error' cell
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        
+        error = data.get('error') if isinstance(data, dict) else None
+        message = error['message'] if isinstance(error, dict) and 'message' in error else data
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['error'])
+        writer.writerow([str(message)])
+        return buffer.getvalue().encode(self.charset)
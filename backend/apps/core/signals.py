@@ -1,5 +1,23 @@
 """
-Signals for automatic audit logging
-Will be implemented in audit app
+Signals for core models
+Audit logging signals live in the audit app
 """
-# This will be populated when audit app is created
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .authentication import invalidate_cached_user
+from .models import SHOP_CACHE_KEY, Shop, User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """Token, role or status changes must not be served from the auth cache"""
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def invalidate_shop_cache(sender, instance, **kwargs):
+    """Shop.current() must not serve an outdated or deleted shop"""
+    cache.delete(SHOP_CACHE_KEY)
@@ -2,41 +2,29 @@
 Factory for creating realistic test data
 Simulates a real electronics shop with hundreds of products
 """
+import json
 from decimal import Decimal
+from functools import lru_cache
+from pathlib import Path
+from django.conf import settings
+from django.db import transaction
 from apps.core.models import User, Shop
 from apps.inventory.models import Category, Brand, Model, Product
 from apps.agents.models import Agent
 
+# Categories, brands and phone models the factory seeds
+SEED_DATA_PATH = Path(__file__).resolve().parent / 'data' / 'test_shop.json'
+
 
 class TestDataFactory:
     """Generate realistic test data for electronics shop"""
     
-    # Realistic Rwandan phone repair shop data
-    CATEGORIES = [
-        ("Screens & Displays", "LCD, OLED, and touch screens"),
-        ("Batteries", "Original and compatible batteries"),
-        ("Charging Ports", "USB-C, Lightning, Micro-USB ports"),
-        ("Cameras", "Front and back camera modules"),
-        ("Speakers & Microphones", "Audio components"),
-        ("Flex Cables", "Power, volume, and connector cables"),
-        ("Back Covers", "Phone back panels and housing"),
-        ("SIM Trays", "SIM card holders"),
-        ("Tools & Accessories", "Repair tools and supplies"),
-    ]
-    
-    BRANDS = [
-        "Samsung", "Apple", "Tecno", "Infinix", "Xiaomi", 
-        "Oppo", "Vivo", "Huawei", "Nokia", "Itel"
-    ]
-    
-    PHONE_MODELS = {
-        "Samsung": ["Galaxy A54", "Galaxy S23", "Galaxy A14", "Galaxy M13"],
-        "Apple": ["iPhone 13", "iPhone 14", "iPhone 12", "iPhone 11"],
-        "Tecno": ["Camon 20", "Spark 10", "Pova 5", "Pop 7"],
-        "Infinix": ["Note 30", "Hot 30", "Smart 7", "Zero 30"],
-        "Xiaomi": ["Redmi Note 12", "Redmi 12", "Poco X5", "Mi 11"],
-        "Oppo": ["A78", "A57", "Reno 8", "A17"],
-    }
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def seed_data():
+        """Realistic Rwandan phone repair shop catalogue, read from SEED_DATA_PATH once"""
+        with open(SEED_DATA_PATH, encoding='utf-8') as f:
+            return json.load(f)
     
     @staticmethod
     def create_shop():
@@ -77,42 +65,39 @@ class TestDataFactory:
     @staticmethod
     def create_categories():
         """Create product categories"""
-        categories = []
-        for name, desc in TestDataFactory.CATEGORIES:
-            cat = Category.objects.create(
-                name=name,
-                description=desc
-            )
-            categories.append(cat)
-        return categories
+        return Category.objects.bulk_create(
+            [Category(**category) for category in TestDataFactory.seed_data()['categories']],
+            batch_size=settings.BULK_BATCH_SIZE
+        )
     
     @staticmethod
     def create_brands_and_models():
         """Create brands and phone models"""
-        brands_dict = {}
-        models_dict = {}
+        # bulk_create sets primary keys on SQLite/PostgreSQL, so models can point at the brands
+        brands = Brand.objects.bulk_create(
+            [Brand(name=brand_name) for brand_name in TestDataFactory.seed_data()['brands']],
+            batch_size=settings.BULK_BATCH_SIZE
+        )
+        brands_dict = {brand.name: brand for brand in brands}
         
-        for brand_name in TestDataFactory.BRANDS:
-            brand = Brand.objects.create(name=brand_name)
-            brands_dict[brand_name] = brand
-            
-            if brand_name in TestDataFactory.PHONE_MODELS:
-                models_dict[brand_name] = []
-                for model_name in TestDataFactory.PHONE_MODELS[brand_name]:
-                    model = Model.objects.create(
-                        brand=brand,
-                        name=model_name,
-                        release_year=2023
-                    )
-                    models_dict[brand_name].append(model)
+        models_dict = {
+            brand_name: [
+                Model(brand=brands_dict[brand_name], name=model_name, release_year=2023)
+                for model_name in model_names
+            ]
+            for brand_name, model_names in TestDataFactory.seed_data()['phone_models'].items()
+        }
+        Model.objects.bulk_create(
+            [model for models_list in models_dict.values() for model in models_list],
+            batch_size=settings.BULK_BATCH_SIZE
+        )
         
         return brands_dict, models_dict
     
     @staticmethod
     def create_realistic_inventory(owner, categories, brands_dict, models_dict):
         """Create hundreds of realistic products"""
-        products = []
-        sku_counter = 1000
+        first_sku_number = 1000
         
         # Pricing ranges for different categories (in RWF)
         pricing = {
@@ -123,44 +108,63 @@ class TestDataFactory:
             "Speakers & Microphones": (3000, 15000),
         }
         
-        for brand_name, models_list in models_dict.items():
-            for model in models_list:
-                # Create parts for each phone model
-                for category in categories[:5]:  # Main categories
-                    if category.name in pricing:
-                        cost_min, cost_max = pricing[category.name]
-                        
-                        # Vary prices within range
-                        cost = Decimal(str(cost_min))
-                        selling = cost * Decimal("1.5")  # 50% markup
-                        
-                        sku = f"{brand_name[:3].upper()}-{model.name[:3].upper()}-{category.name[:3].upper()}-{sku_counter:04d}"
-                        name = f"{model.name} {category.name.split()[0]}"
-                        
-                        # Realistic stock levels
-                        if category.name == "Screens & Displays":
-                            stock = 15  # Higher value items, lower stock
-                        elif category.name == "Batteries":
-                            stock = 50  # Fast movers, higher stock
-                        else:
-                            stock = 30  # Medium stock
-                        
-                        product = Product(
-                            sku=sku,
-                            name=name,
-                            category=category,
-                            brand=brands_dict[brand_name],
-                            phone_model=model,
-                            cost_price=cost,
-                            selling_price=selling,
-                            quantity_in_stock=stock,
-                            reorder_level=5 if stock < 20 else 10,
-                            created_by=owner
-                        )
-                        products.append(product)
-                        sku_counter += 1
+        # Everything that depends only on the category, worked out once per category
+        part_types = []
+        for category in categories[:5]:  # Main categories
+            if category.name not in pricing:
+                continue
+            cost_min, cost_max = pricing[category.name]
+            cost = Decimal(str(cost_min))
+            
+            # Realistic stock levels
+            if category.name == "Screens & Displays":
+                stock = 15  # Higher value items, lower stock
+            elif category.name == "Batteries":
+                stock = 50  # Fast movers, higher stock
+            else:
+                stock = 30  # Medium stock
+            
+            part_types.append((
+                category.pk,
+                category.name[:3].upper(),
+                category.name.split()[0],
+                cost,
+                cost * Decimal("1.5"),  # 50% markup
+                stock,
+                5 if stock < 20 else 10,
+            ))
         
-        Product.objects.bulk_create(products)
+        # Parts for each phone model; foreign keys are set by id, skipping the
+        # related-object descriptors on every row
+        parts = [
+            (
+                brands_dict[brand_name].pk, brand_name[:3].upper(),
+                model.pk, model.name, model.name[:3].upper(), part_type
+            )
+            for brand_name, models_list in models_dict.items()
+            for model in models_list
+            for part_type in part_types
+        ]
+        products = [
+            Product(
+                sku=f"{brand_code}-{model_code}-{category_code}-{sku_counter:04d}",
+                name=f"{model_name} {name_word}",
+                category_id=category_id,
+                brand_id=brand_id,
+                phone_model_id=model_id,
+                cost_price=cost,
+                selling_price=selling,
+                quantity_in_stock=stock,
+                reorder_level=reorder_level,
+                created_by_id=owner.pk
+            )
+            for sku_counter, (
+                brand_id, brand_code, model_id, model_name, model_code,
+                (category_id, category_code, name_word, cost, selling, stock, reorder_level)
+            ) in enumerate(parts, start=first_sku_number)
+        ]
+        
+        Product.objects.bulk_create(products, batch_size=settings.BULK_BATCH_SIZE)
         return products
     
     @staticmethod
@@ -169,24 +173,26 @@ class TestDataFactory:
         areas = ["Kigali CBD", "Nyabugogo", "Remera", "Kimironko", "Gikondo", 
                  "Nyamirambo", "Kicukiro", "Kanombe", "Kabuga", "Kimihurura"]
         
-        agents = []
-        for i in range(count):
-            agent = Agent.objects.create(
-                full_name=f"Agent {i+1}",
-                phone_number=f"+25078800{i:04d}",
-                business_name=f"Tech Repair {i+1}",
-                area=areas[i % len(areas)],
-                credit_limit=Decimal(str(300000 + (i * 50000))),
-                is_active=True,
-                created_by=owner
-            )
-            agents.append(agent)
-        
-        return agents
+        return Agent.objects.bulk_create(
+            [
+                Agent(
+                    full_name=f"Agent {i+1}",
+                    phone_number=f"+25078800{i:04d}",
+                    business_name=f"Tech Repair {i+1}",
+                    area=areas[i % len(areas)],
+                    credit_limit=Decimal(str(300000 + (i * 50000))),
+                    is_active=True,
+                    created_by=owner
+                )
+                for i in range(count)
+            ],
+            batch_size=settings.BULK_BATCH_SIZE
+        )
     
     @staticmethod
+    @transaction.atomic
     def setup_full_test_shop():
-        """Create complete realistic shop setup"""
+        """Create complete realistic shop setup, committed once as a single transaction"""
         shop = TestDataFactory.create_shop()
         owner, cashier = TestDataFactory.create_users()
         categories = TestDataFactory.create_categories()
@@ -1,21 +1,23 @@
 """
 API test cases for authentication endpoints
 """
-from django.test import TestCase
+from unittest import mock
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from apps.core.models import User, Shop
+from apps.core.authentication import get_auth_cache, token_cache_key
+from apps.core.models import User, Shop, hash_session_token, verify_dummy_password
 
 
 class AuthenticationAPITests(TestCase):
     """Test authentication API endpoints"""
     
-    def setUp(self):
-        self.client = APIClient()
-        
+    @classmethod
+    def setUpTestData(cls):
         # Create shop
-        self.shop = Shop.objects.create(
+        cls.shop = Shop.objects.create(
             name="Test Shop",
             owner_name="Owner",
             phone_number="+250788123456",
@@ -24,23 +26,26 @@ class AuthenticationAPITests(TestCase):
         )
         
         # Create users
-        self.owner = User.objects.create(
+        cls.owner = User.objects.create(
             username="owner",
             full_name="Shop Owner",
             role=User.OWNER,
             is_active=True
         )
-        self.owner.set_password("owner123")
-        self.owner.save()
+        cls.owner.set_password("owner123")
+        cls.owner.save()
         
-        self.cashier = User.objects.create(
+        cls.cashier = User.objects.create(
             username="cashier",
             full_name="Cashier User",
             role=User.CASHIER,
             is_active=True
         )
-        self.cashier.set_password("cashier123")
-        self.cashier.save()
+        cls.cashier.set_password("cashier123")
+        cls.cashier.save()
+    
+    def setUp(self):
+        self.client = APIClient()
     
     def test_login_success(self):
         """Test successful login returns token and user data"""
@@ -82,6 +87,15 @@ class AuthenticationAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertFalse(response.data['success'])
     
+    def test_login_nonexistent_user_still_hashes(self):
+        """Unknown usernames pay the same Argon2 cost as a wrong password"""
+        url = reverse('login')
+        with mock.patch('apps.core.views.verify_dummy_password', wraps=verify_dummy_password) as verify:
+            response = self.client.post(url, {'username': 'nonexistent', 'password': 'x'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        verify.assert_called_once_with('x')
+    
     def test_login_inactive_user(self):
         """Test login with inactive user fails"""
         self.owner.is_active = False
@@ -111,7 +125,95 @@ class AuthenticationAPITests(TestCase):
         
         # Verify token is cleared
         self.owner.refresh_from_db()
-        self.assertEqual(self.owner.session_token, '')
+        self.assertIsNone(self.owner.session_token_hash)
+    
+    def test_token_lookup_cached_between_requests(self):
+        """Test repeated requests authenticate without querying users"""
+        token = self.owner.generate_session_token()
+        url = reverse('me')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        self.client.get(url)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['data']['username'], 'owner')
+    
+    @override_settings(
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'auth': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth'},
+        },
+        AUTH_USER_CACHE_ALIAS='auth'
+    )
+    def test_token_cache_uses_configured_alias(self):
+        """Test authenticated users are cached in the AUTH_USER_CACHE_ALIAS backend"""
+        token = self.owner.generate_session_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        self.client.get(reverse('me'))
+        
+        key = token_cache_key(hash_session_token(token))
+        self.assertEqual(caches['auth'].get(key), self.owner.pk)
+        self.assertIsNone(caches['default'].get(key))
+        
+        self.client.post(reverse('logout'))
+        self.assertIsNone(caches['auth'].get(key))
+    
+    def test_logout_revokes_cached_token(self):
+        """Test a cached token stops working once the user logs out"""
+        token = self.owner.generate_session_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        self.assertEqual(self.client.get(reverse('me')).status_code, status.HTTP_200_OK)
+        
+        with self.assertNumQueries(1):
+            self.client.post(reverse('logout'))
+        self.assertIsNone(get_auth_cache().get(token_cache_key(hash_session_token(token))))
+        response = self.client.get(reverse('me'))
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_new_login_revokes_cached_token(self):
+        """Test a cached token stops working once the user logs in again"""
+        old_token = self.owner.generate_session_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {old_token}')
+        self.assertEqual(self.client.get(reverse('me')).status_code, status.HTTP_200_OK)
+        
+        new_token = self.owner.generate_session_token()
+        self.assertEqual(self.client.get(reverse('me')).status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {new_token}')
+        self.assertEqual(self.client.get(reverse('me')).status_code, status.HTTP_200_OK)
+    
+    def test_user_list_loads_only_serialized_columns(self):
+        """Test the owner's user list renders without reading password hashes"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        token = self.owner.generate_session_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        self.client.get(reverse('me'))  # authenticate once so the user is cached
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user-list'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({u['username'] for u in response.data['results']}, {'owner', 'cashier'})
+        self.assertFalse(any('password_hash' in q['sql'] for q in queries.captured_queries))
+    
+    def test_current_shop_cached_until_saved(self):
+        """Test the shop config is read once and refreshed after a change"""
+        token = self.owner.generate_session_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        url = reverse('shop-current')
+        self.client.get(url)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['data']['name'], "Test Shop")
+        
+        self.shop.name = "Renamed Shop"
+        self.shop.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['data']['name'], "Renamed Shop")
     
     def test_me_endpoint(self):
         """Test /me endpoint returns current user"""
@@ -132,6 +234,9 @@ class AuthenticationAPITests(TestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(response.data['success'])
+        self.assertEqual(response.data['error']['code'], 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
     
     def test_expired_token_rejected(self):
         """Test expired token is rejected"""
@@ -147,3 +252,29 @@ class AuthenticationAPITests(TestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ORJSONRendererTests(TestCase):
+    """orjson renderer keeps DRF's JSON wire format"""
+    
+    def test_matches_drf_json_renderer(self):
+        """Test decimals, datetimes and lazy strings render like JSONRenderer"""
+        import json
+        from decimal import Decimal
+        from django.utils import timezone
+        from django.utils.translation import gettext_lazy
+        from rest_framework.renderers import JSONRenderer
+        from apps.core.renderers import ORJSONRenderer
+        
+        data = {
+            'total': Decimal('1500.50'),
+            'at': timezone.now(),
+            'message': gettext_lazy('Not found.'),
+            'rows': [{'id': 1, 'name': 'Agent'}],
+        }
+        
+        self.assertEqual(
+            json.loads(ORJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data))
+        )
+        self.assertEqual(ORJSONRenderer().render(None), b'')
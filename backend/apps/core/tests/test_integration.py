@@ -13,9 +13,10 @@ from apps.agents.models import Agent
 class RealisticShopTests(TestCase):
     """Test system with realistic shop data volume"""
     
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """Create full shop with realistic data"""
-        self.shop_data = TestDataFactory.setup_full_test_shop()
+        cls.shop_data = TestDataFactory.setup_full_test_shop()
     
     def test_shop_creation_with_full_inventory(self):
         """Test system handles complete shop setup"""
@@ -44,24 +45,23 @@ class RealisticShopTests(TestCase):
     def test_product_search_performance(self):
         """Test product search works with many products"""
         # Search for Samsung products
-        samsung_products = Product.objects.filter(brand__name="Samsung")
-        self.assertGreater(samsung_products.count(), 0)
+        samsung_count = Product.objects.filter(brand__name="Samsung").count()
+        self.assertGreater(samsung_count, 0)
         
         # Search for screens
-        screens = Product.objects.filter(category__name__icontains="Screen")
-        self.assertGreater(screens.count(), 0)
+        screens_count = Product.objects.filter(category__name__icontains="Screen").count()
+        self.assertGreater(screens_count, 0)
         
-        print(f"\n✓ Found {samsung_products.count()} Samsung products")
-        print(f"✓ Found {screens.count()} screen products")
+        print(f"\n✓ Found {samsung_count} Samsung products")
+        print(f"✓ Found {screens_count} screen products")
     
     def test_low_stock_detection_at_scale(self):
         """Test low stock detection works with many products"""
         # Set some products to low stock
-        products = Product.objects.all()[:5]
-        for product in products:
-            product.quantity_in_stock = 3
-            product.reorder_level = 10
-            product.save()
+        Product.objects.filter(pk__in=Product.objects.values('pk')[:5]).update(
+            quantity_in_stock=3,
+            reorder_level=10
+        )
         
         low_stock_products = Product.objects.filter(
             quantity_in_stock__lte=F('reorder_level')
@@ -79,24 +79,25 @@ class RealisticShopTests(TestCase):
     
     def test_agent_credit_limits(self):
         """Test agent credit management at scale"""
-        agents = Agent.objects.all()
-        
-        for agent in agents:
-            self.assertGreater(agent.credit_limit, 0)
-            self.assertEqual(agent.total_debt, Decimal('0'))
-            self.assertTrue(agent.can_take_more_stock)
+        # outstanding_debt is a trigger-maintained column, so each check is one query
+        self.assertFalse(Agent.objects.filter(credit_limit__lte=0).exists())
+        self.assertFalse(Agent.objects.exclude(outstanding_debt=0).exists())
+        # can_take_more_stock: unlimited (0) or debt still under the limit
+        self.assertFalse(
+            Agent.objects.exclude(credit_limit=0).filter(outstanding_debt__gte=F('credit_limit')).exists()
+        )
     
     def test_category_distribution(self):
         """Test products are distributed across categories"""
         from apps.inventory.models import Category
         from django.db.models import Count
         
-        categories_with_counts = Category.objects.annotate(
+        categories_with_products = Category.objects.annotate(
             product_count=Count('products')
-        ).filter(product_count__gt=0)
+        ).filter(product_count__gt=0).count()
         
-        self.assertGreater(categories_with_counts.count(), 3)
-        print(f"\n✓ {categories_with_counts.count()} categories with products")
+        self.assertGreater(categories_with_products, 3)
+        print(f"\n✓ {categories_with_products} categories with products")
     
     def test_realistic_pricing(self):
         """Test products have realistic Rwanda market prices"""
@@ -116,21 +117,25 @@ class RealisticShopTests(TestCase):
 class PerformanceTests(TestCase):
     """Test system performance with high data volume"""
     
-    def setUp(self):
-        self.shop_data = TestDataFactory.setup_full_test_shop()
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop_data = TestDataFactory.setup_full_test_shop()
     
     def test_bulk_product_query_performance(self):
         """Test querying many products is efficient"""
         import time
         
         start = time.time()
-        products = list(Product.objects.select_related(
+        # Consumed once, so stream from the cursor instead of caching the result set
+        count = 0
+        for product in Product.objects.select_related(
             'category', 'brand', 'phone_model'
-        ).all())
+        ).iterator(chunk_size=500):
+            count += 1
         end = time.time()
         
         query_time = end - start
-        print(f"\n✓ Queried {len(products)} products in {query_time:.3f} seconds")
+        print(f"\n✓ Queried {count} products in {query_time:.3f} seconds")
         self.assertLess(query_time, 1.0, "Query should take less than 1 second")
     
     def test_filtered_search_performance(self):
@@ -4,7 +4,7 @@ Test cases for core models (User, Shop)
 from django.test import TestCase
 from django.utils import timezone
 from datetime import timedelta
-from apps.core.models import User, Shop
+from apps.core.models import User, Shop, hash_session_token
 
 
 class ShopModelTests(TestCase):
@@ -80,7 +80,7 @@ class UserModelTests(TestCase):
         """Test session token can be generated"""
         token = self.owner.generate_session_token()
         self.assertEqual(len(token), 43)  # urlsafe_base64 length
-        self.assertEqual(self.owner.session_token, token)
+        self.assertEqual(self.owner.session_token_hash, hash_session_token(token))
         self.assertIsNotNone(self.owner.session_expires_at)
     
     def test_token_expiry(self):
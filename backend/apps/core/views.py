@@ -7,7 +7,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.utils import timezone
 
-from .models import User, Shop
+from .models import User, Shop, verify_dummy_password
 from .serializers import UserSerializer, LoginSerializer, ShopSerializer
 from .permissions import IsOwner
 
@@ -27,6 +27,7 @@ def login(request):
     try:
         user = User.objects.get(username=username, is_active=True)
     except User.DoesNotExist:
+        verify_dummy_password(password)
         return Response(
             {'success': False, 'error': 'Invalid credentials'},
             status=status.HTTP_401_UNAUTHORIZED
@@ -56,10 +57,7 @@ def logout(request):
     """
     Logout endpoint - invalidates current session token
     """
-    user = request.user
-    user.session_token = ''
-    user.session_expires_at = None
-    user.save(update_fields=['session_token', 'session_expires_at'])
+    request.user.clear_session()
     
     return Response({
         'success': True,
@@ -87,6 +85,13 @@ class UserViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
     permission_classes = [IsOwner]
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # Only the columns UserSerializer renders; skips password and session hashes
+            queryset = queryset.only(*UserSerializer.Meta.fields)
+        return queryset
+    
     def create(self, request, *args, **kwargs):
         """
         Create new user with password
@@ -148,7 +153,7 @@ class ShopViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Get current shop configuration
         """
-        shop = Shop.objects.first()
+        shop = Shop.current()
         if not shop:
             return Response(
                 {'success': False, 'error': 'Shop not configured'},
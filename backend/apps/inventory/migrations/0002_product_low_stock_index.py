@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-16 03:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(
+                    ("is_active", True),
+                    ("quantity_in_stock__lte", models.F("reorder_level")),
+                ),
+                fields=["-created_at"],
+                name="idx_product_low_stock",
+            ),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.30 on 2026-10-16 03:20
+
+from django.db import migrations
+
+# Product search (sku, name, description, barcode) is a substring match. SQLite
+# answers it from an FTS5 trigram index kept in sync by triggers; PostgreSQL
+# gets pg_trgm GIN indexes that serve the ILIKE queries directly.
+# SQLite drops a table's triggers when Django rebuilds it (AddField, AlterField
+# etc.), so a later migration that rebuilds products must run create_search_index.
+SEARCH_COLUMNS = ["sku", "name", "description", "barcode"]
+
+COLUMNS = ", ".join(SEARCH_COLUMNS)
+NEW_VALUES = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+OLD_VALUES = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+
+CREATE_SQL = {
+    "sqlite": [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_search USING fts5(
+            {COLUMNS}, content='products', content_rowid='id', tokenize='trigram'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS products_search_insert AFTER INSERT ON products
+        BEGIN
+            INSERT INTO products_search(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS products_search_delete AFTER DELETE ON products
+        BEGIN
+            INSERT INTO products_search(products_search, rowid, {COLUMNS})
+            VALUES ('delete', old.id, {OLD_VALUES});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS products_search_update
+        AFTER UPDATE OF {COLUMNS} ON products
+        BEGIN
+            INSERT INTO products_search(products_search, rowid, {COLUMNS})
+            VALUES ('delete', old.id, {OLD_VALUES});
+            INSERT INTO products_search(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES});
+        END
+        """,
+        "INSERT INTO products_search(products_search) VALUES ('rebuild')",
+    ],
+    "postgresql": ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
+    + [
+        f"CREATE INDEX IF NOT EXISTS products_{column}_trgm "
+        f"ON products USING gin (UPPER({column}) gin_trgm_ops)"
+        for column in SEARCH_COLUMNS
+    ],
+}
+
+DROP_SQL = {
+    "sqlite": [
+        "DROP TRIGGER IF EXISTS products_search_insert",
+        "DROP TRIGGER IF EXISTS products_search_delete",
+        "DROP TRIGGER IF EXISTS products_search_update",
+        "DROP TABLE IF EXISTS products_search",
+    ],
+    "postgresql": [
+        f"DROP INDEX IF EXISTS products_{column}_trgm" for column in SEARCH_COLUMNS
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for sql in CREATE_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in DROP_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0002_product_low_stock_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
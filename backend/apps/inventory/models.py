@@ -3,6 +3,7 @@ Inventory models for EROM System
 Products, categories, and stock movements (append-only)
 """
 from django.db import models
+from django.db.models import F, Q
 from apps.core.models import TimeStampedModel, User
 
 
@@ -109,6 +110,13 @@ class Product(TimeStampedModel):
             models.Index(fields=['name']),
             models.Index(fields=['category', 'is_active']),
             models.Index(fields=['barcode']),
+            # Partial index over exactly the rows the low_stock action lists: no plain
+            # index serves a column-to-column comparison, and -created_at skips the sort
+            models.Index(
+                fields=['-created_at'],
+                condition=Q(quantity_in_stock__lte=F('reorder_level'), is_active=True),
+                name='idx_product_low_stock'
+            ),
         ]
     
     def __str__(self):
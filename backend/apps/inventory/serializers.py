@@ -1,7 +1,9 @@
 """
 Serializers for inventory module
 """
+from decimal import Decimal
 from rest_framework import serializers
+from apps.core.fieldsets import SparseFieldsSerializerMixin
 from .models import Category, Brand, Model, Product, InventoryMovement
 
 
@@ -15,9 +17,11 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_subcategories(self, obj):
-        if obj.subcategories.exists():
-            return CategorySerializer(obj.subcategories.filter(is_active=True), many=True).data
-        return []
+        # Prefetched by CategoryViewSet; query only past the prefetched depth
+        subcategories = getattr(obj, 'active_subcategories', None)
+        if subcategories is None:
+            subcategories = obj.subcategories.filter(is_active=True)
+        return CategorySerializer(subcategories, many=True).data
 
 
 class BrandSerializer(serializers.ModelSerializer):
@@ -38,7 +42,7 @@ class ModelSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Lightweight serializer for product lists"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     brand_name = serializers.CharField(source='brand.name', read_only=True)
@@ -49,9 +53,10 @@ class ProductListSerializer(serializers.ModelSerializer):
             'id', 'sku', 'name', 'category', 'category_name', 'brand', 'brand_name',
             'quantity_in_stock', 'quantity_in_field', 'selling_price', 'is_active', 'is_low_stock'
         ]
+        property_sources = {'is_low_stock': ['quantity_in_stock', 'reorder_level']}
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Detailed serializer for single product"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     brand_name = serializers.CharField(source='brand.name', read_only=True)
@@ -71,6 +76,11 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'created_by']
+        property_sources = {
+            'total_quantity': ['quantity_in_stock', 'quantity_in_field'],
+            'stock_value': ['quantity_in_stock', 'quantity_in_field', 'cost_price'],
+            'is_low_stock': ['quantity_in_stock', 'reorder_level'],
+        }
 
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
@@ -83,18 +93,15 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
             'quantity_in_stock', 'reorder_level', 'cost_price', 'selling_price',
             'image', 'barcode', 'is_active'
         ]
-    
-    def validate_sku(self, value):
-        """Ensure SKU is unique"""
-        instance = self.instance
-        if Product.objects.filter(sku=value).exclude(pk=instance.pk if instance else None).exists():
-            raise serializers.ValidationError("Product with this SKU already exists")
-        return value
+        # The unique index on sku is the duplicate check; ProductViewSet maps
+        # its IntegrityError to a 400 instead of probing the table first
+        extra_kwargs = {'sku': {'validators': []}}
     
     def validate(self, data):
         """Validate pricing"""
-        cost_price = data.get('cost_price', 0)
-        selling_price = data.get('selling_price', 0)
+        # Partial updates compare against the stored price for whichever side is omitted
+        cost_price = data.get('cost_price', getattr(self.instance, 'cost_price', Decimal('0')))
+        selling_price = data.get('selling_price', getattr(self.instance, 'selling_price', Decimal('0')))
         
         if selling_price < cost_price:
             raise serializers.ValidationError({
@@ -1,13 +1,19 @@
 """
 API tests for inventory endpoints
 """
+import csv
+import io
+from unittest import mock
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from decimal import Decimal
 from apps.core.models import User, Shop
-from apps.inventory.models import Category, Brand, Model, Product
+from apps.inventory.models import Category, Brand, Model, Product, InventoryMovement
+from apps.inventory.views import ProductViewSet
 
 
 class InventoryAPITests(TestCase):
@@ -79,6 +85,55 @@ class InventoryAPITests(TestCase):
         self.assertEqual(response.data['count'], 1)
         self.assertEqual(response.data['results'][0]['sku'], 'TEST-001')
     
+    def test_list_products_queries_do_not_grow_with_products(self):
+        """Test category and brand names come from the list query itself"""
+        url = reverse('product-list')
+        self.client.get(url)  # authenticate once so the user is cached
+        
+        for i in range(5):
+            brand = Brand.objects.create(name=f"Brand {i}")
+            Product.objects.create(
+                sku=f"LIST-{i:03d}",
+                name=f"Listed Product {i}",
+                category=Category.objects.create(name=f"Category {i}"),
+                brand=brand,
+                phone_model=self.model,
+                cost_price=Decimal("1000"),
+                selling_price=Decimal("1500"),
+                quantity_in_stock=50,
+                created_by=self.owner
+            )
+        
+        with self.assertNumQueries(2):  # count + page
+            response = self.client.get(url)
+        
+        row = next(r for r in response.data['results'] if r['sku'] == 'LIST-003')
+        self.assertEqual(row['category_name'], "Category 3")
+        self.assertEqual(row['brand_name'], "Brand 3")
+        self.assertFalse(row['is_low_stock'])
+    
+    def test_sparse_fieldsets(self):
+        """Test ?fields= narrows the rendered fields and the loaded columns"""
+        list_url = reverse('product-list')
+        self.client.get(list_url)  # authenticate once so the user is cached
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(list_url, {'fields': 'sku,brand_name,is_low_stock,bogus'})
+        self.assertEqual(response.data['results'], [
+            {'sku': 'TEST-001', 'brand_name': 'Test Brand', 'is_low_stock': False}
+        ])
+        page_sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('"products"."description"', page_sql)
+        self.assertNotIn('"categories"', page_sql)
+        
+        detail_url = reverse('product-detail', args=[self.product.id])
+        with self.assertNumQueries(1):
+            response = self.client.get(detail_url, {'fields': 'id,stock_value,created_by_name'})
+        self.assertEqual(
+            response.data,
+            {'id': self.product.id, 'stock_value': '5000000.00', 'created_by_name': self.owner.full_name}
+        )
+    
     def test_create_product(self):
         """Test creating new product"""
         url = reverse('product-list')
@@ -98,6 +153,23 @@ class InventoryAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Product.objects.count(), 2)
     
+    def test_create_product_duplicate_sku(self):
+        """Test a duplicate SKU is rejected as a field error"""
+        url = reverse('product-list')
+        data = {
+            'sku': 'TEST-001',
+            'name': 'Duplicate',
+            'category': self.category.id,
+            'brand': self.brand.id,
+            'cost_price': '60000',
+            'selling_price': '90000'
+        }
+        response = self.client.post(url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('sku', response.data['error']['details'])
+        self.assertEqual(Product.objects.count(), 1)
+    
     def test_update_product(self):
         """Test updating product"""
         url = reverse('product-detail', args=[self.product.id])
@@ -117,6 +189,14 @@ class InventoryAPITests(TestCase):
         self.product.refresh_from_db()
         self.assertEqual(self.product.name, 'Updated Product Name')
     
+    def test_partial_update_checks_stored_cost_price(self):
+        """Test a PATCH cannot drop the selling price below the stored cost price"""
+        url = reverse('product-detail', args=[self.product.id])
+        response = self.client.patch(url, {'selling_price': '40000'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('selling_price', response.data['error']['details'])
+    
     def test_low_stock_filter(self):
         """Test low stock filtering"""
         # Create low stock product
@@ -133,12 +213,14 @@ class InventoryAPITests(TestCase):
         )
         
         url = reverse('product-low-stock')
-        response = self.client.get(url)
+        self.client.get(url)  # authenticate once so the user is cached
+        with self.assertNumQueries(2):  # count + page
+            response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        # Response format: {'success': True, 'data': [...], 'count': N}
+        # Paginated like the list: {'count': N, 'next': ..., 'previous': ..., 'results': [...]}
         self.assertEqual(response.data['count'], 1)
-        self.assertEqual(response.data['data'][0]['sku'], 'LOW-STOCK-001')
+        self.assertEqual(response.data['results'][0]['sku'], 'LOW-STOCK-001')
     
     def test_adjust_stock_owner_only(self):
         """Test stock adjustment requires owner permission"""
@@ -159,6 +241,21 @@ class InventoryAPITests(TestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
     
+    def test_adjust_stock_applies_to_stored_quantity(self):
+        """Test an adjustment does not overwrite stock changed after the product was read"""
+        stale = Product.objects.get(pk=self.product.pk)
+        Product.objects.filter(pk=self.product.pk).update(quantity_in_stock=120)
+        
+        url = reverse('product-adjust-stock', args=[self.product.id])
+        with mock.patch.object(ProductViewSet, 'get_object', return_value=stale):
+            response = self.client.post(
+                url, {'product_id': self.product.id, 'quantity_delta': -10, 'reason': 'Damaged'}, format='json'
+            )
+        
+        self.assertEqual(response.data['data']['new_quantity'], 110)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity_in_stock, 110)
+    
     def test_list_categories(self):
         """Test listing categories"""
         url = reverse('category-list')
@@ -167,6 +264,120 @@ class InventoryAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertGreater(response.data['count'], 0)
     
+    def test_category_tree_queries_do_not_grow_with_categories(self):
+        """Test nested subcategories are prefetched per level, inactive ones left out"""
+        def add_tree(prefix):
+            root = Category.objects.create(name=f"{prefix} root")
+            child = Category.objects.create(name=f"{prefix} child", parent=root)
+            Category.objects.create(name=f"{prefix} grandchild", parent=child)
+            Category.objects.create(name=f"{prefix} retired", parent=root, is_active=False)
+        
+        url = reverse('category-tree')
+        add_tree("A")
+        self.client.get(url)  # authenticate once so the user is cached
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        
+        for prefix in "BCD":
+            add_tree(prefix)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        
+        tree = {row['name']: row for row in response.data['data']}
+        self.assertEqual([c['name'] for c in tree["B root"]['subcategories']], ["B child"])
+        grandchildren = tree["B root"]['subcategories'][0]['subcategories']
+        self.assertEqual([c['name'] for c in grandchildren], ["B grandchild"])
+    
+    def test_list_movements_in_one_query(self):
+        """Test the movement list joins product and user names without per-row queries"""
+        url = reverse('movement-list')
+        self.client.get(url)  # authenticate once so the user is cached
+        for delta in (5, -2, 3):
+            InventoryMovement.objects.create(
+                product=self.product,
+                movement_type=InventoryMovement.ADJUSTMENT,
+                quantity_delta=delta,
+                performed_by=self.owner
+            )
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        
+        self.assertEqual(len(queries), 2)  # count + page
+        self.assertNotIn('password_hash', queries.captured_queries[-1]['sql'])
+        row = response.data['results'][0]
+        self.assertEqual(row['product_sku'], 'TEST-001')
+        self.assertEqual(row['performed_by_name'], self.owner.full_name)
+    
+    def test_movements_by_product_paginated(self):
+        """Test a product's movement history is served one page at a time"""
+        InventoryMovement.objects.bulk_create([
+            InventoryMovement(
+                product=self.product,
+                movement_type=InventoryMovement.ADJUSTMENT,
+                quantity_delta=1,
+                performed_by=self.owner
+            )
+            for _ in range(150)
+        ])
+        url = reverse('movement-by-product')
+        response = self.client.get(url, {'product_id': self.product.id})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 150)
+        self.assertEqual(len(response.data['results']), 100)
+        self.assertIsNotNone(response.data['next'])
+    
+    def test_export_movements_csv(self):
+        """Test the movement ledger streams as CSV and honours the list filters"""
+        InventoryMovement.objects.create(
+            product=self.product,
+            movement_type=InventoryMovement.PURCHASE,
+            quantity_delta=20,
+            performed_by=self.owner,
+            notes='Restock, supplier "A"'
+        )
+        InventoryMovement.objects.create(
+            product=self.product,
+            movement_type=InventoryMovement.ADJUSTMENT,
+            quantity_delta=-2,
+            performed_by=self.owner
+        )
+        url = reverse('movement-export-csv')
+        response = self.client.get(url, {'movement_type': InventoryMovement.PURCHASE})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['product_sku'], 'TEST-001')
+        self.assertEqual(rows[0]['quantity_delta'], '20')
+        self.assertEqual(rows[0]['performed_by'], self.owner.full_name)
+        self.assertEqual(rows[0]['notes'], 'Restock, supplier "A"')
+    
+    def test_export_movements_csv_accept_header(self):
+        """Test clients asking for text/csv get the export rather than a 406"""
+        InventoryMovement.objects.create(
+            product=self.product,
+            movement_type=InventoryMovement.PURCHASE,
+            quantity_delta=5,
+            performed_by=self.owner
+        )
+        url = reverse('movement-export-csv')
+        response = self.client.get(url, HTTP_ACCEPT='text/csv')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['quantity_delta'] for row in rows], ['5'])
+        
+        # Errors are rendered as CSV too instead of failing negotiation
+        self.client.credentials()
+        response = self.client.get(url, HTTP_ACCEPT='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(next(csv.reader(io.StringIO(response.content.decode()))), ['error'])
+    
     def test_search_products_by_name(self):
         """Test product search functionality"""
         url = reverse('product-list')
@@ -175,6 +386,36 @@ class InventoryAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['count'], 1)
     
+    def test_search_action_matches_substrings(self):
+        """Test the search action matches sku/name/description substrings and exact barcodes"""
+        other = Product.objects.create(
+            sku="LCD-A54",
+            name="Galaxy Screen",
+            description="Original AMOLED panel",
+            barcode="6001234567890",
+            category=self.category,
+            cost_price=Decimal("20000"),
+            selling_price=Decimal("30000"),
+            created_by=self.owner
+        )
+        url = reverse('product-search')
+        
+        def search(query):
+            response = self.client.get(url, {'q': query})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return sorted(row['id'] for row in response.data['results'])
+        
+        self.assertEqual(search('amoled'), [other.id])
+        self.assertEqual(search('st-00'), [self.product.id])
+        self.assertEqual(search('6001234567890'), [other.id])
+        self.assertEqual(search('1234'), [])
+        self.assertEqual(search('e'), sorted([self.product.id, other.id]))
+        
+        # Renames are picked up by the index
+        other.name = "Galaxy Test Screen"
+        other.save()
+        self.assertEqual(search('test'), sorted([self.product.id, other.id]))
+    
     def test_filter_products_by_category(self):
         """Test filtering products by category"""
         url = reverse('product-list')
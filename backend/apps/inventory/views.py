@@ -3,10 +3,20 @@ Views for inventory management
 """
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, F
+from django.db import IntegrityError, transaction
+from django.db.models import Q, F, Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+import csv
 
+from apps.core.fieldsets import SparseFieldsViewMixin
+from apps.core.renderers import CSVRenderer
+from apps.core.filters import TrigramSearchFilter, can_use_trigram_index, trigram_condition
 from apps.core.permissions import IsCashierOrOwner, IsOwner, IsOwnerOrReadOnly
 from .models import Category, Brand, Model, Product, InventoryMovement
 from .serializers import (
@@ -16,6 +26,23 @@ from .serializers import (
 )
 
 
+# Levels of active subcategories prefetched under each category; deeper levels
+# (unusual for a parts catalogue) fall back to one query per category
+CATEGORY_TREE_DEPTH = 3
+
+
+def active_subcategory_prefetches(depth=CATEGORY_TREE_DEPTH):
+    """Prefetch active subcategories into .active_subcategories, depth levels down"""
+    return [
+        Prefetch(
+            '__'.join(['active_subcategories'] * level + ['subcategories']),
+            queryset=Category.objects.filter(is_active=True),
+            to_attr='active_subcategories'
+        )
+        for level in range(depth)
+    ]
+
+
 class CategoryViewSet(viewsets.ModelViewSet):
     """
     ViewSet for product categories
@@ -33,6 +60,9 @@ class CategoryViewSet(viewsets.ModelViewSet):
         # Only show active categories by default
         if self.request.query_params.get('show_inactive') != 'true':
             queryset = queryset.filter(is_active=True)
+        if self.action in ['list', 'retrieve', 'tree']:
+            # One query per tree level instead of two per category (see CategorySerializer)
+            queryset = queryset.prefetch_related(*active_subcategory_prefetches())
         return queryset
     
     @action(detail=False, methods=['get'])
@@ -96,7 +126,12 @@ class ModelViewSet(viewsets.ModelViewSet):
         })
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductSearchPagination(PageNumberPagination):
+    """Type-ahead search pages stay small"""
+    page_size = 20
+
+
+class ProductViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for products
     """
@@ -104,37 +139,58 @@ class ProductViewSet(viewsets.ModelViewSet):
         'category', 'brand', 'phone_model', 'created_by'
     ).all()
     permission_classes = [IsCashierOrOwner]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [TrigramSearchFilter, DjangoFilterBackend, filters.OrderingFilter]
     search_fields = ['sku', 'name', 'description', 'barcode']
+    search_index = 'products_search'
     filterset_fields = ['category', 'brand', 'phone_model', 'is_active']
     ordering_fields = ['name', 'sku', 'selling_price', 'quantity_in_stock', 'created_at']
     ordering = ['-created_at']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'low_stock', 'search']:
+            # Only what ProductListSerializer renders: two narrow joins for the
+            # category/brand names (FK columns kept so Django can attach them)
+            queryset = queryset.select_related(None).select_related('category', 'brand').only(
+                'id', 'sku', 'name', 'category', 'category__name', 'brand', 'brand__name',
+                'quantity_in_stock', 'quantity_in_field', 'selling_price', 'reorder_level',
+                'is_active'
+            )
+        return queryset
+    
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ['list', 'low_stock', 'search']:
             return ProductListSerializer
         elif self.action in ['create', 'update', 'partial_update']:
             return ProductCreateUpdateSerializer
         return ProductDetailSerializer
     
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        self.save_product(serializer, created_by=self.request.user)
+    
+    def perform_update(self, serializer):
+        self.save_product(serializer)
+    
+    def save_product(self, serializer, **kwargs):
+        """Save, reporting a duplicate SKU from the unique index as a field error"""
+        try:
+            with transaction.atomic():
+                serializer.save(**kwargs)
+        except IntegrityError as exc:
+            if 'sku' not in str(exc):
+                raise
+            raise ValidationError({'sku': ['Product with this SKU already exists']})
     
     @action(detail=False, methods=['get'])
     def low_stock(self, request):
-        """Get products with low stock"""
+        """Get products with low stock, one page at a time"""
         products = self.get_queryset().filter(
             quantity_in_stock__lte=F('reorder_level'),
             is_active=True
         )
-        serializer = ProductListSerializer(products, many=True)
-        return Response({
-            'success': True,
-            'data': serializer.data,
-            'count': products.count()
-        })
+        return self.paginated_response(products)
     
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=ProductSearchPagination)
     def search(self, request):
         """Advanced product search"""
         query = request.query_params.get('q', '')
@@ -146,18 +202,20 @@ class ProductViewSet(viewsets.ModelViewSet):
                 'message': 'No search query provided'
             })
         
+        if can_use_trigram_index([query]):
+            text_match = trigram_condition(self.search_index, [query], ['sku', 'name', 'description'])
+        else:
+            text_match = Q(sku__icontains=query) | Q(name__icontains=query) | Q(description__icontains=query)
         products = self.get_queryset().filter(
-            Q(sku__icontains=query) |
-            Q(name__icontains=query) |
-            Q(barcode=query) |
-            Q(description__icontains=query)
-        ).filter(is_active=True)[:20]  # Limit to 20 results
-        
-        serializer = ProductListSerializer(products, many=True)
-        return Response({
-            'success': True,
-            'data': serializer.data
-        })
+            text_match | Q(barcode=query)
+        ).filter(is_active=True)
+        return self.paginated_response(products)
+    
+    def paginated_response(self, queryset):
+        """Serialize one page of queryset; the paginator applies LIMIT/OFFSET in SQL"""
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'], permission_classes=[IsOwner])
     def adjust_stock(self, request, pk=None):
@@ -169,38 +227,73 @@ class ProductViewSet(viewsets.ModelViewSet):
         quantity_delta = serializer.validated_data['quantity_delta']
         reason = serializer.validated_data['reason']
         
-        # Create inventory movement
-        movement = InventoryMovement.objects.create(
-            product=product,
-            movement_type=InventoryMovement.ADJUSTMENT,
-            quantity_delta=quantity_delta,
-            from_location='shop',
-            to_location='shop',
-            performed_by=request.user,
-            notes=reason
-        )
-        
-        # Update product stock
-        product.quantity_in_stock += quantity_delta
-        product.save(update_fields=['quantity_in_stock', 'updated_at'])
+        with transaction.atomic():
+            # Create inventory movement
+            movement = InventoryMovement.objects.create(
+                product=product,
+                movement_type=InventoryMovement.ADJUSTMENT,
+                quantity_delta=quantity_delta,
+                from_location='shop',
+                to_location='shop',
+                performed_by=request.user,
+                notes=reason
+            )
+            
+            # Update product stock relative to the stored count, so a concurrent
+            # sale or adjustment between get_object() and here is not overwritten
+            Product.objects.filter(pk=product.pk).update(
+                quantity_in_stock=F('quantity_in_stock') + quantity_delta,
+                updated_at=timezone.now()
+            )
+            new_quantity = Product.objects.values_list('quantity_in_stock', flat=True).get(pk=product.pk)
         
         return Response({
             'success': True,
             'message': 'Stock adjusted successfully',
             'data': {
-                'new_quantity': product.quantity_in_stock,
+                'new_quantity': new_quantity,
                 'movement_id': movement.id
             }
         })
 
 
+# CSV header -> queryset column; values_list rows skip model instances entirely
+MOVEMENT_CSV_COLUMNS = {
+    'id': 'id',
+    'created_at': 'created_at',
+    'product_sku': 'product__sku',
+    'product_name': 'product__name',
+    'movement_type': 'movement_type',
+    'quantity_delta': 'quantity_delta',
+    'from_location': 'from_location',
+    'to_location': 'to_location',
+    'reference_id': 'reference_id',
+    'performed_by': 'performed_by__full_name',
+    'notes': 'notes',
+}
+MOVEMENT_CSV_CHUNK_SIZE = 2000
+
+
+class _EchoBuffer:
+    """File-like object for csv.writer that hands each formatted line back"""
+    
+    def write(self, value):
+        return value
+
+
 class InventoryMovementViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for inventory movements (read-only)
     """
+    # The joined product and user rows only contribute the names the serializer renders
     queryset = InventoryMovement.objects.select_related(
         'product', 'performed_by', 'reversal_approved_by'
-    ).all()
+    ).only(
+        'id', 'product', 'product__name', 'product__sku', 'movement_type', 'quantity_delta',
+        'from_location', 'to_location', 'reference_id', 'reversal_of', 'reversal_reason',
+        'reversal_approved_by', 'reversal_approved_by__full_name',
+        'performed_by', 'performed_by__full_name', 'notes', 'created_at'
+    )
     serializer_class = InventoryMovementSerializer
     permission_classes = [IsCashierOrOwner]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -219,8 +312,27 @@ class InventoryMovementViewSet(viewsets.ReadOnlyModelViewSet):
             )
         
         movements = self.get_queryset().filter(product_id=product_id)
-        serializer = self.get_serializer(movements, many=True)
-        return Response({
-            'success': True,
-            'data': serializer.data
-        })
+        page = self.paginate_queryset(movements)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'], renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer])
+    def export_csv(self, request):
+        """
+        Stream the (filtered) movement ledger as CSV
+        Rows are read from the cursor in chunks and written as they arrive,
+        so memory stays flat however long the ledger is
+        """
+        rows = self.filter_queryset(self.get_queryset()).values_list(
+            *MOVEMENT_CSV_COLUMNS.values()
+        ).iterator(chunk_size=MOVEMENT_CSV_CHUNK_SIZE)
+        writer = csv.writer(_EchoBuffer())
+        
+        def lines():
+            yield writer.writerow(MOVEMENT_CSV_COLUMNS.keys())
+            for row in rows:
+                yield writer.writerow(row)
+        
+        response = StreamingHttpResponse(lines(), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="inventory_movements.csv"'
+        return response
@@ -1,12 +1,20 @@
 """
 Licensing and activation models for EROM System
 """
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
 from django.utils import timezone
 from apps.core.models import TimeStampedModel, User
 import hashlib
 import secrets
 
+KEY_ATTEMPTS = 3
+
+# 32 unambiguous characters; 256 is a multiple of 32, so mapping a random byte
+# through (byte & 31) picks each character with equal probability
+KEY_ALPHABET = b'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+_KEY_BYTE_TO_CHAR = bytes(KEY_ALPHABET[byte & 31] for byte in range(256))
+
 
 class License(TimeStampedModel):
     """
@@ -59,20 +67,28 @@ class License(TimeStampedModel):
     @classmethod
     def generate_license_key(cls):
         """
-        Generate a unique license key
-        Format: EROM-XXXX-XXXX-XXXX-XXXX
+        Generate a random license key
+        Format: EROM-XXXX-XXXX-XXXX-XXXX (32^16 keys, so collisions are left to the
+        unique index; use issue() to create a license with one)
         """
-        while True:
-            # Generate random parts
-            parts = [
-                ''.join(secrets.choice('ABCDEFGHJKLMNPQRSTUVWXYZ23456789') for _ in range(4))
-                for _ in range(4)
-            ]
-            license_key = f"EROM-{'-'.join(parts)}"
-            
-            # Check if unique
-            if not cls.objects.filter(license_key=license_key).exists():
-                return license_key
+        chars = secrets.token_bytes(16).translate(_KEY_BYTE_TO_CHAR).decode()
+        return f"EROM-{chars[0:4]}-{chars[4:8]}-{chars[8:12]}-{chars[12:16]}"
+    
+    @classmethod
+    def issue(cls, **fields):
+        """
+        Create a license under a freshly generated key
+        The INSERT is the uniqueness check; a colliding key is retried with a new one,
+        any other constraint failure (from `fields`) is raised at once
+        """
+        for attempt in range(KEY_ATTEMPTS):
+            license_key = cls.generate_license_key()
+            try:
+                with transaction.atomic():
+                    return cls.objects.create(license_key=license_key, **fields)
+            except IntegrityError:
+                if attempt == KEY_ATTEMPTS - 1 or not cls.objects.filter(license_key=license_key).exists():
+                    raise
     
     def can_activate(self):
         """Check if license can be activated"""
@@ -89,22 +105,35 @@ class License(TimeStampedModel):
     
     def activate(self, device_id):
         """Activate license for a device"""
-        can_activate, message = self.can_activate()
-        if not can_activate:
-            return False, message
-        
-        # Create activation record
-        activation = LicenseActivation.objects.create(
-            license=self,
-            device_id=device_id,
-            activation_date=timezone.now()
-        )
+        now = timezone.now()
+        with transaction.atomic():
+            # Claim a slot with one conditional UPDATE: the WHERE clause re-checks the
+            # stored row, so concurrent activations cannot exceed max_activations
+            claimed = License.objects.filter(
+                Q(expiry_date__isnull=True) | Q(expiry_date__gte=now),
+                pk=self.pk,
+                is_active=True,
+                activation_count__lt=F('max_activations')
+            ).update(
+                is_activated=True,
+                activated_at=now,
+                activation_count=F('activation_count') + 1
+            )
+            if not claimed:
+                self.refresh_from_db()
+                can_activate, message = self.can_activate()
+                return False, message if not can_activate else "Maximum activations reached"
+            
+            # Create activation record
+            activation = LicenseActivation.objects.create(
+                license=self,
+                device_id=device_id,
+                activation_date=now
+            )
         
-        # Update license
         self.is_activated = True
-        self.activated_at = timezone.now()
-        self.activation_count += 1
-        self.save()
+        self.activated_at = now
+        self.refresh_from_db(fields=['activation_count'])
         
         return True, activation
 
@@ -137,11 +166,20 @@ class LicenseActivation(TimeStampedModel):
     
     def deactivate(self, reason=''):
         """Deactivate this device"""
+        now = timezone.now()
+        with transaction.atomic():
+            # Only the call that actually flips is_active frees the license slot
+            deactivated = LicenseActivation.objects.filter(pk=self.pk, is_active=True).update(
+                is_active=False,
+                deactivation_date=now,
+                deactivation_reason=reason
+            )
+            if deactivated:
+                # Decrease activation count on license
+                License.objects.filter(pk=self.license_id, activation_count__gt=0).update(
+                    activation_count=F('activation_count') - 1
+                )
+        
         self.is_active = False
-        self.deactivation_date = timezone.now()
+        self.deactivation_date = now
         self.deactivation_reason = reason
-        self.save()
-        
-        # Decrease activation count on license
-        self.license.activation_count = max(0, self.license.activation_count - 1)
-        self.license.save()
@@ -0,0 +1,115 @@
+"""
+Test cases for licensing models
+"""
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+from django.db import IntegrityError
+from django.test import TestCase
+from django.utils import timezone
+from apps.licensing.models import KEY_ALPHABET, KEY_ATTEMPTS, License, LicenseActivation, _KEY_BYTE_TO_CHAR
+
+
+class LicenseIssueTests(TestCase):
+    """Test license key issuance"""
+    
+    def test_generated_key_layout(self):
+        """Test keys are EROM plus four groups of four alphabet characters"""
+        alphabet = KEY_ALPHABET.decode()
+        for _ in range(50):
+            key = License.generate_license_key()
+            self.assertRegex(key, r'^EROM-(\w{4})-(\w{4})-(\w{4})-(\w{4})$')
+            self.assertTrue(set(key[5:].replace('-', '')) <= set(alphabet), key)
+    
+    def test_key_byte_table_is_uniform(self):
+        """Test every byte maps into the alphabet and each character gets the same share"""
+        self.assertEqual(len(KEY_ALPHABET), 32)
+        self.assertEqual(len(_KEY_BYTE_TO_CHAR), 256)
+        self.assertEqual(Counter(_KEY_BYTE_TO_CHAR), Counter({char: 8 for char in KEY_ALPHABET}))
+    
+    def test_issue_retries_on_key_collision(self):
+        """Test a colliding key is replaced by a fresh one"""
+        existing = License.issue(customer_name="First")
+        keys = iter([existing.license_key, "EROM-AAAA-BBBB-CCCC-DDDD"])
+        
+        with mock.patch.object(License, 'generate_license_key', side_effect=lambda: next(keys)):
+            issued = License.issue(customer_name="Second")
+        
+        self.assertEqual(issued.license_key, "EROM-AAAA-BBBB-CCCC-DDDD")
+        self.assertEqual(License.objects.count(), 2)
+    
+    def test_issue_gives_up_after_key_attempts(self):
+        """Test KEY_ATTEMPTS consecutive collisions re-raise the IntegrityError"""
+        existing = License.issue()
+        
+        with mock.patch.object(License, 'generate_license_key', return_value=existing.license_key) as generate:
+            with self.assertRaises(IntegrityError):
+                License.issue()
+        
+        self.assertEqual(generate.call_count, KEY_ATTEMPTS)
+        self.assertEqual(License.objects.count(), 1)
+    
+    
+    def test_issue_raises_other_integrity_errors_at_once(self):
+        """Test a constraint failure from the caller's fields is not retried as a key collision"""
+        with mock.patch.object(License, 'generate_license_key', wraps=License.generate_license_key) as generate:
+            with self.assertRaises(IntegrityError):
+                License.issue(max_activations=None)
+        
+        self.assertEqual(generate.call_count, 1)
+        self.assertFalse(License.objects.exists())
+
+class LicenseActivationTests(TestCase):
+    """Test activation slots are claimed and freed against the stored counter"""
+    
+    def test_activation_cap_enforced(self):
+        """Test activations beyond max_activations are refused and leave the counter at the cap"""
+        license = License.issue(max_activations=2)
+        stale = License.objects.get(pk=license.pk)
+        
+        self.assertTrue(license.activate('device-1')[0])
+        self.assertTrue(license.activate('device-2')[0])
+        # Read before either activation: only the stored row's counter decides
+        self.assertEqual(stale.activate('device-3'), (False, "Maximum activations reached"))
+        
+        license.refresh_from_db()
+        self.assertEqual(license.activation_count, 2)
+        self.assertEqual(license.activations.count(), 2)
+    
+    def test_revoked_and_expired_refused_without_counting(self):
+        """Test revoked and expired licenses report why and keep their counter"""
+        revoked = License.issue(is_active=False)
+        expired = License.issue(expiry_date=timezone.now() - timedelta(days=1))
+        
+        self.assertEqual(revoked.activate('device-1'), (False, "License is revoked"))
+        self.assertEqual(expired.activate('device-2'), (False, "License has expired"))
+        
+        for license in (revoked, expired):
+            license.refresh_from_db()
+            self.assertEqual(license.activation_count, 0)
+            self.assertFalse(license.is_activated)
+        self.assertFalse(LicenseActivation.objects.exists())
+    
+    def test_deactivate_twice_frees_one_slot(self):
+        """Test a repeated deactivate decrements the counter only once"""
+        license = License.issue(max_activations=2)
+        license.activate('device-1')
+        _, activation = license.activate('device-2')
+        
+        activation.deactivate('Replaced')
+        LicenseActivation.objects.get(pk=activation.pk).deactivate('Replaced again')
+        
+        license.refresh_from_db()
+        self.assertEqual(license.activation_count, 1)
+        self.assertFalse(LicenseActivation.objects.get(pk=activation.pk).is_active)
+    
+    def test_activation_count_never_negative(self):
+        """Test deactivating with the counter already at 0 leaves it at 0"""
+        license = License.issue()
+        _, activation = license.activate('device-1')
+        License.objects.filter(pk=license.pk).update(activation_count=0)
+        
+        activation.deactivate()
+        
+        license.refresh_from_db()
+        self.assertEqual(license.activation_count, 0)
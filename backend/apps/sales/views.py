@@ -29,6 +29,19 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['transaction_date', 'total_amount']
     ordering = ['-transaction_date']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # TransactionListSerializer renders no items, customer fields or notes:
+            # drop the items prefetch and the approver join, keep the cashier's name
+            queryset = queryset.prefetch_related(None).select_related(None).select_related(
+                'processed_by'
+            ).only(
+                'id', 'transaction_id', 'transaction_type', 'transaction_date',
+                'total_amount', 'payment_method', 'processed_by', 'processed_by__full_name'
+            )
+        return queryset
+    
     def get_serializer_class(self):
         if self.action == 'list':
             return TransactionListSerializer
@@ -76,20 +76,34 @@ DATABASES = {
         'OPTIONS': {
             # Critical optimizations for embedded desktop app
             'timeout': 20,  # Prevent "database is locked" errors
+        },
+        # On-disk test database so pytest --reuse-db can keep it between runs
+        # (pass --create-db after adding migrations)
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
         }
     }
 }
 
+# SQLite PRAGMA settings applied to every new connection (see below)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # with WAL: syncs at checkpoints, not on every commit
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+    'mmap_size': 256 * 1024 * 1024,
+    'foreign_keys': 'ON',
+}
+
 # SQLite PRAGMA settings will be applied via connection post-init signal
 def init_sqlite_pragmas(sender, connection, **kwargs):
     """Enable WAL mode and other performance optimizations for SQLite"""
     if connection.vendor == 'sqlite':
+        # Read through django.conf so settings modules that override SQLITE_PRAGMAS apply
+        from django.conf import settings
         cursor = connection.cursor()
-        cursor.execute('PRAGMA journal_mode=WAL;')
-        cursor.execute('PRAGMA synchronous=NORMAL;')
-        cursor.execute('PRAGMA cache_size=-64000;')
-        cursor.execute('PRAGMA temp_store=MEMORY;')
-        cursor.execute('PRAGMA foreign_keys=ON;')
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma}={value};')
         cursor.close()
 
 from django.db.backends.signals import connection_created
@@ -134,7 +148,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'apps.core.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -150,6 +164,31 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'apps.core.exceptions.custom_exception_handler',
 }
 
+# Agent debt aging buckets are cached briefly and invalidated on ledger/payment
+# writes (total debt is read from the trigger-maintained outstanding_debt column);
+# point the alias at a shared cache backend when running more than one process
+AGENT_DEBT_CACHE_ALIAS = 'default'
+AGENT_DEBT_CACHE_TIMEOUT = 60  # seconds
+
+# Authenticated users are cached per session token for this long (seconds);
+# dropped on every User save and logout, and never past the session expiry.
+# Those invalidations only reach the cache they run against, so point the alias
+# at a shared cache backend when running more than one process; otherwise a
+# revoked token keeps working in the other processes until the entry expires
+AUTH_USER_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE_TIMEOUT = 300
+
+# Shop configuration is cached for this long (seconds); dropped on every Shop write
+SHOP_CACHE_TIMEOUT = 300
+
+# Rows per INSERT/UPDATE statement for bulk_create / bulk_update; set
+# EROM_BULK_BATCH to tune it for the host (see README, Testing)
+BULK_BATCH_SIZE = int(os.environ.get('EROM_BULK_BATCH', 500))
+
+# argon2.PasswordHasher keyword arguments for User passwords; empty means the
+# library defaults (config.settings_test lowers them to keep the suite fast)
+ARGON2_PARAMS = {}
+
 # CORS settings for Electron
 # Allow requests from React frontend
 CORS_ALLOWED_ORIGINS = [
@@ -210,3 +249,7 @@ os.makedirs(BACKUP_DIR, exist_ok=True)
 
 # Encryption key for backups (will be derived from master password)
 BACKUP_ENCRYPTION_ALGORITHM = 'AES-256-GCM'
+
+# Seeded demo database written by dump_demo_snapshot and restored by
+# create_demo_data --from-snapshot
+DEMO_SNAPSHOT_PATH = BASE_DIR / 'demo_snapshot.sqlite3'
@@ -0,0 +1,15 @@
+"""
+Settings for the test suite
+"""
+from .settings import *  # noqa: F401,F403
+
+# Minimum Argon2 cost: tests hash passwords in setUp, never check their strength
+ARGON2_PARAMS = {
+    'time_cost': 1,
+    'memory_cost': 8,
+    'parallelism': 1,
+    'hash_len': 16,
+}
+
+# The test database is thrown away, so skip fsync entirely
+SQLITE_PRAGMAS = {**SQLITE_PRAGMAS, 'synchronous': 'OFF'}  # noqa: F405
@@ -3,6 +3,7 @@ Pytest configuration and fixtures
 """
 import pytest
 from django.conf import settings
+from django.core.cache import caches
 
 
 def pytest_configure(config):
@@ -15,3 +16,10 @@ def pytest_configure(config):
 def enable_db_access_for_all_tests(db):
     """Allow all tests to access database"""
     pass
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Cached figures are keyed by primary key; don't let them leak between tests"""
+    for cache in caches.all():
+        cache.clear()